@@ -1,94 +1,157 @@
-import requests
+import asyncio
 from datetime import datetime
-from typing import List
+from functools import partial
+from typing import Any, AsyncIterator, Dict, List, Optional
 from base_agent import BaseAgent
 from event_model import EventItem
 
+BASE_URL = "https://api.predicthq.com"
+EVENTS_PATH = "/v1/events/"
+MAX_PAGE_SIZE = 500
+# Results beyond this offset are not served; the API sets "overflow" instead
+MAX_RESULTS = 10000
+
+
+def _parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value.replace("Z", "+00:00")) if value else None
+
 
 class PredictHQAgent(BaseAgent):
     name: str = "PredictHQAgent"
+    source: str = "predicthq"
     api_key: str = ""
+    base_url: str = BASE_URL
 
     async def process(self, data: dict) -> List[EventItem]:
+        return await self.collect(data)
+
+    async def stream(self, data: dict) -> AsyncIterator[List[EventItem]]:
         self.api_key = data["api_key"]
+        self.base_url = data.get("base_url") or BASE_URL
+        self.trusted_parsing = data.get("trusted_parsing", False)
         start_datetime = data["start_datetime"]
         end_datetime = data["end_datetime"]
         origin = data.get("location_origin", "51.5074,-0.1278")
         offset_km = data.get("location_offset_km", 30)
         country = data.get("country", "GB")
+        size = min(data.get("size") or MAX_PAGE_SIZE, MAX_PAGE_SIZE)
+        concurrency = data.get("page_concurrency", 5)
+        semaphore = asyncio.Semaphore(concurrency)
 
         headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Accept": "application/json"
         }
 
-        url = "https://api.predicthq.com/v1/events/"
-        size = 100
-        offset = 0
-        events = []
-
-        while True:
-            params = {
-                "location_around.origin": origin,
-                "location_around.offset": f"{offset_km}km",
-                "country": country,
-                "scope": "locality",  # остаётся в коде
-                "start.gte": start_datetime,
-                "start.lte": end_datetime,
-                "limit": size,
-                "offset": offset,
-                "sort": "start"
-            }
-
-            try:
-                response = requests.get(url, headers=headers, params=params)
+        base_params = {
+            "location_around.origin": origin,
+            "location_around.offset": f"{offset_km}km",
+            "country": country,
+            "scope": "locality",  # остаётся в коде
+            "start.gte": start_datetime,
+            "start.lte": end_datetime,
+            "limit": size,
+            "sort": "start"
+        }
+        if data.get("categories"):
+            base_params["category"] = ",".join(data["categories"])
+
+        async def fetch_offset(offset: int) -> bytes:
+            # Throttled requests are retried by the rate limiter; any other failure fails
+            # the job, so a lost page is never recorded as fetched
+            async with semaphore:
+                response = await self.fetch(self.base_url + EVENTS_PATH, params={**base_params, "offset": offset}, headers=headers)
+            response.raise_for_status()
+            return response.body
+
+        async def parsed_offset(offset: int) -> List[EventItem]:
+            payload = await fetch_offset(offset)
+            return await self.parse_payload(payload) if payload else []
+
+        payload = await fetch_offset(0)
+        first = self.decode(payload) if payload else None
+        if not first:
+            await self.log("PredictHQAgent parsed 0 events")
+            return
+
+        if first.get("overflow"):
+            await self.log(f"PredictHQ result set overflows {MAX_RESULTS} events; narrow the query to get the rest", level="WARNING")
+
+        total = len(self.page_events(first))
+        events = self.build_events(self.event_fields(e) for e in self.page_events(first))
+        self._advance(events)
+        yield events
+
+        count = first.get("count")
+        if count is not None:
+            # "count" tells us every remaining offset up front, so keep `page_concurrency`
+            # of them in flight and yield the pages in offset order
+            offsets = range(size, min(count, MAX_RESULTS), size)
+            async for events in self.prefetch((partial(parsed_offset, offset) for offset in offsets), concurrency):
+                if events:
+                    total += len(events)
+                    self._advance(events)
+                    yield events
+        else:
+            next_url = first.get("next")
+            while next_url:
+                async with semaphore:
+                    response = await self.fetch(next_url, headers=headers)
+                # Like an offset page, a failed cursor page fails the job instead of truncating it
                 response.raise_for_status()
-                data_json = response.json()
-                results = data_json.get("results", [])
-                if not results:
-                    break
-
-                for e in results:
-                    geo = e.get("geo", {})
-                    addr = geo.get("address", {})
-                    events.append(EventItem(
-                        source_id=e.get("id"),
-                        title=e.get("title"),
-                        url=None,
-                        start_date=e.get("start"),
-                        sales_start=None,
-                        sales_end=None,
-                        duration_seconds=e.get("duration"),
-                        timezone=e.get("timezone"),
-                        city=addr.get("locality"),
-                        country="United Kingdom",
-                        venue=(e.get("entities", [{}])[0].get("name") if e.get("entities") else None),
-                        latitude=e.get("location", [None, None])[1],
-                        longitude=e.get("location", [None, None])[0],
-                        segment=None,
-                        genre=None,
-                        subgenre=None,
-                        category=e.get("category"),
-                        labels=e.get("labels"),
-                        promoter=None,
-                        attendance=e.get("phq_attendance"),
-                        predicted_spend=e.get("predicted_event_spend"),
-                        description=e.get("description"),
-                        image_urls=None,
-                        ticket_urls=None,
-                        price=None
-                    ))
-
-                offset += size
-                if not data_json.get("overflow"):
-                    break
-
-            except Exception as e:
-                await self.handle_error(e, context=data)
-                break
-
-        await self.log(f"PredictHQAgent parsed {len(events)} events")
-        return events
+                page = self.decode(response.body)
+                events = self.build_events(self.event_fields(e) for e in self.page_events(page))
+                total += len(events)
+                self._advance(events)
+                yield events
+                next_url = page.get("next")
+
+        await self.log(f"PredictHQAgent parsed {total} events")
+
+    def _advance(self, events: List[EventItem]) -> None:
+        # Results are sorted by start, so everything before the last start of a page has been seen
+        if events and events[-1].start_date is not None:
+            self.progress = events[-1].start_date
+
+    def page_events(self, json_data: Optional[Dict[str, Any]]) -> List[dict]:
+        if not json_data:
+            return []
+        return json_data.get("results", [])
+
+    def parse_event(self, e: dict) -> EventItem:
+        return EventItem(**self.event_fields(e))
+
+    def event_fields(self, e: dict) -> dict:
+        geo = e.get("geo", {})
+        addr = geo.get("address", {})
+        return dict(
+            source=self.source,
+            source_id=e.get("id"),
+            title=e.get("title"),
+            url=None,
+            start_date=_parse_datetime(e.get("start")),
+            sales_start=None,
+            sales_end=None,
+            duration_seconds=e.get("duration"),
+            timezone=e.get("timezone"),
+            city=addr.get("locality"),
+            country="United Kingdom",
+            venue=(e.get("entities", [{}])[0].get("name") if e.get("entities") else None),
+            latitude=e.get("location", [None, None])[1],
+            longitude=e.get("location", [None, None])[0],
+            segment=None,
+            genre=None,
+            subgenre=None,
+            category=e.get("category"),
+            labels=e.get("labels"),
+            promoter=None,
+            attendance=e.get("phq_attendance"),
+            predicted_spend=e.get("predicted_event_spend"),
+            description=e.get("description"),
+            image_urls=None,
+            ticket_urls=None,
+            price=None
+        )
 
 
 # import requests
@@ -1,26 +1,68 @@
-
+import asyncio
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from serpapi import GoogleSearch
-from typing import Any, List
+from typing import Any, AsyncIterator, List, Optional
 from event_model import EventItem
 from base_agent import BaseAgent
+from http_transport import HttpResponse
+from rate_limiter import get_rate_limiter
+from response_cache import cache_key, get_cache
 from datetime import datetime, timezone
 from dateutil.parser import parse as parse_date
 
+BASE_URL = "https://serpapi.com"
+SEARCH_PATH = "/search"
+# Error SerpApi returns (with HTTP 200) past the last page of results
+NO_RESULTS_ERROR = "Google hasn't returned any results for this query."
+
+
+class SerpApiError(Exception):
+    pass
+
+
+
+def guess_start_date(raw_date: Optional[str], start_dt: datetime, end_dt: datetime) -> Optional[datetime]:
+    """
+    Google Events gives dates like "Jan 5" without a year; picks the year
+    that puts the date inside the requested range.
+    """
+    if not raw_date:
+        return None
+    for year in [start_dt.year, start_dt.year + 1]:
+        try:
+            tentative = datetime.strptime(f"{raw_date} {year}", "%b %d %Y").replace(tzinfo=timezone.utc)
+            if start_dt <= tentative <= end_dt:
+                return tentative
+        except ValueError:
+            continue
+    return None
 
 class SerpApiAgent(BaseAgent):
     name: str = "SerpApiAgent"
+    source: str = "serpapi"
+    base_url: str = BASE_URL
+    # Requested date range, used to place Google's year-less dates
+    start_dt: Optional[datetime] = None
+    end_dt: Optional[datetime] = None
 
     async def process(self, data: dict) -> List[EventItem]:
+        return await self.collect(data)
+
+    async def stream(self, data: dict) -> AsyncIterator[List[EventItem]]:
         await self.log(f"Sending request to SerpApi for city: {data['city']}")
+        self.trusted_parsing = data.get("trusted_parsing", False)
+        self.base_url = data.get("base_url") or BASE_URL
 
-        start_dt = parse_date(data["start_datetime"])
-        end_dt = parse_date(data["end_datetime"])
+        self.start_dt = parse_date(data["start_datetime"])
+        self.end_dt = parse_date(data["end_datetime"])
         api_key = data["api_key"]
         city = data["city"]
         keyword = data.get("keyword", "")
-        max_pages = 10  # жёстко задаём 10 запросов
-        size = 20       # жёстко задаём по 20 результатов
+        max_pages = data.get("max_pages") or 10
+        size = data.get("size") or 20
 
         query_parts = ["events"]
         if keyword and keyword.strip().lower() != "event":
@@ -36,84 +78,142 @@ class SerpApiAgent(BaseAgent):
             "gl": "us"
         }
 
-        parsed_events = []
         seen_keys = set()
+        total = 0
 
-        for i in range(max_pages):
-            start_index = i * size
-            params = base_params.copy()
-            params["start"] = start_index
-            search = GoogleSearch(params)
-            results = search.get_dict()
-            events = results.get("events_results", [])
-
-            if not events:
-                break
-
+        async for events in self._fetch_pages(base_params, max_pages, size, data.get("page_concurrency", 4)):
+            rows = []
             for event in events:
-                raw_date = event.get("date", {}).get("start_date")
-                start_date = None
-                if raw_date:
-                    for year in [start_dt.year, start_dt.year + 1]:
-                        try:
-                            tentative = datetime.strptime(f"{raw_date} {year}", "%b %d %Y").replace(tzinfo=timezone.utc)
-                            if start_dt <= tentative <= end_dt:
-                                start_date = tentative
-                                break
-                        except ValueError:
-                            continue
-
-                city_val = country_val = None
-                address = event.get("address", [])
-                if len(address) > 1:
-                    city_val = address[1].split(",")[0].strip()
-                    country_val = address[1].split(",")[-1].strip()
-
                 key = f"{event.get('title')}-{event.get('link')}"
                 if key in seen_keys:
                     continue
                 seen_keys.add(key)
-
-                image_urls = list(filter(None, [
-                    event.get("thumbnail"),
-                    event.get("image")
-                ]))
-
-                ticket_urls = [
-                    t.get("link") for t in event.get("ticket_info", [])
-                    if t.get("link")
-                ]
-
-                parsed_events.append(EventItem(
-                    source_id=None,
-                    title=event.get("title"),
-                    url=event.get("link"),
-                    start_date=start_date,
-                    sales_start=None,
-                    sales_end=None,
-                    duration_seconds=None,
-                    timezone="Europe/London",
-                    city=city_val,
-                    country=country_val,
-                    venue=event.get("venue", {}).get("name"),
-                    latitude=None,
-                    longitude=None,
-                    segment="Music",
-                    genre="Pop",
-                    subgenre=None,
-                    category="concert",
-                    labels=["concert"],
-                    promoter=None,
-                    attendance=None,
-                    predicted_spend=None,
-                    description=event.get("description"),
-                    image_urls=image_urls or None,
-                    ticket_urls=ticket_urls or None,
-                    price=None
-                ))
-
-        await self.log(f"Received {len(parsed_events)} unique events from SerpApi")
-        return parsed_events
+                rows.append(self.event_fields(event))
+            total += len(rows)
+            yield self.build_events(rows)
+
+        await self.log(f"Received {total} unique events from SerpApi")
+
+    async def _fetch_pages(self, base_params: dict, max_pages: int, size: int, workers: int) -> AsyncIterator[List[dict]]:
+        """
+        Runs the blocking GoogleSearch calls in a bounded thread pool, up to
+        ``workers`` pages speculatively ahead of the consumer, each one going
+        through the shared rate limiter (tokens, 429 ``Retry-After`` and
+        backoff retries). The first empty page ends the results and cancels
+        the requests after it; any other error payload fails the job.
+
+        :return: Async iterator over non-empty pages of raw events, in page order.
+        """
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="serpapi")
+        limiter = get_rate_limiter()
+        cache = get_cache()
+        search_url = self.base_url + SEARCH_PATH
+
+        def run_search(params: dict) -> HttpResponse:
+            client = GoogleSearch(params)
+            client.BACKEND = self.base_url
+            response = client.get_response(SEARCH_PATH)
+            return HttpResponse(url=search_url, status=response.status_code, headers=dict(response.headers), body=response.content)
+
+        def page_results(response: HttpResponse) -> List[dict]:
+            try:
+                results = self.decode(response.body) if response.body else {}
+            except ValueError:
+                response.raise_for_status()
+                raise
+            error = results.get("error")
+            if error == NO_RESULTS_ERROR:
+                return []
+            if error:
+                raise SerpApiError(f"SerpApi error: {error}")
+            response.raise_for_status()
+            return self.page_events(results)
+
+        async def search(start_index: int) -> List[dict]:
+            params = base_params.copy()
+            params["start"] = start_index
+            started = time.perf_counter()
+            key = cache_key(search_url, params)
+            cached = await asyncio.to_thread(cache.get, self.source, key) if cache else None
+            if cached is not None:
+                self._record_request(search_url, cached, started, cached=True)
+                return page_results(cached)
+
+            response = await limiter.request(
+                self.source, base_params["api_key"], lambda: loop.run_in_executor(executor, run_search, params)
+            )
+            self._record_request(search_url, response, started, cached=False)
+            events = page_results(response)
+            if cache:
+                await asyncio.to_thread(cache.put, self.source, key, response)
+            return events
+
+        pages = self.prefetch((partial(search, index * size) for index in range(max_pages)), workers)
+        try:
+            async for events in pages:
+                if not events:
+                    break
+                yield events
+        finally:
+            await pages.aclose()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def page_events(self, json_data: Optional[dict]) -> List[dict]:
+        if not json_data:
+            return []
+        return json_data.get("events_results", [])
+
+    def parse_event(self, event: dict) -> EventItem:
+        return EventItem(**self.event_fields(event))
+
+    def event_fields(self, event: dict) -> dict:
+        start_date = guess_start_date(event.get("date", {}).get("start_date"), self.start_dt, self.end_dt)
+
+        city_val = country_val = None
+        address = event.get("address", [])
+        if len(address) > 1:
+            city_val = address[1].split(",")[0].strip()
+            country_val = address[1].split(",")[-1].strip()
+
+        image_urls = list(filter(None, [
+            event.get("thumbnail"),
+            event.get("image")
+        ]))
+
+        ticket_urls = [
+            t.get("link") for t in event.get("ticket_info", [])
+            if t.get("link")
+        ]
+
+        return dict(
+            source=self.source,
+            source_id=None,
+            title=event.get("title"),
+            url=event.get("link"),
+            start_date=start_date,
+            sales_start=None,
+            sales_end=None,
+            duration_seconds=None,
+            timezone="Europe/London",
+            city=city_val,
+            country=country_val,
+            venue=event.get("venue", {}).get("name"),
+            latitude=None,
+            longitude=None,
+            segment="Music",
+            genre="Pop",
+            subgenre=None,
+            category="concert",
+            labels=["concert"],
+            promoter=None,
+            attendance=None,
+            predicted_spend=None,
+            description=event.get("description"),
+            image_urls=image_urls or None,
+            ticket_urls=ticket_urls or None,
+            price=None
+        )
 
 
 
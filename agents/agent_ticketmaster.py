@@ -1,75 +1,192 @@
-import requests
+import asyncio
+from collections import deque
 from datetime import datetime, timedelta
-from typing import Any, List
+from functools import partial
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, NamedTuple, Optional, Tuple
 from base_agent import BaseAgent
 from event_model import EventItem
 
+DATE_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+BASE_URL = "https://app.ticketmaster.com"
+EVENTS_PATH = "/discovery/v2/events.json"
+
+# Discovery API refuses to page past size * page >= 1000 and caps size at 200
+DEEP_PAGING_LIMIT = 1000
+MAX_PAGE_SIZE = 200
+MIN_WINDOW = timedelta(hours=1)
+
+
+class Shard(NamedTuple):
+    start: datetime
+    end: datetime
+    classification: Optional[str] = None
+
+
+def _coordinate(value: Any) -> Optional[float]:
+    # Venues without a location stay unlocated instead of landing at 0,0
+    return float(value) if value not in (None, "") else None
+
 
 class TicketmasterAgent(BaseAgent):
     name: str = "TicketmasterAgent"
+    source: str = "ticketmaster"
     api_key: str = ""
+    base_url: str = BASE_URL
 
     async def process(self, data: dict) -> List[EventItem]:
+        return await self.collect(data)
+
+    async def stream(self, data: dict) -> AsyncIterator[List[EventItem]]:
         self.api_key = data["api_key"]
+        self.base_url = data.get("base_url") or BASE_URL
+        self.trusted_parsing = data.get("trusted_parsing", False)
         city = data["city"]
-        start_datetime = datetime.strptime(data["start_datetime"], "%Y-%m-%dT%H:%M:%SZ")
-        end_datetime = datetime.strptime(data["end_datetime"], "%Y-%m-%dT%H:%M:%SZ")
-        size = data.get("size", 100)
-        max_pages = data.get("max_pages", 50)
-
-        # Защита от превышения лимита Ticketmaster (1000 результатов)
-        if size * max_pages > 1000:
-            max_pages = 1000 // size
-
-        url = "https://app.ticketmaster.com/discovery/v2/events.json"
-        all_events = []
+        start_datetime = datetime.strptime(data["start_datetime"], DATE_FORMAT)
+        end_datetime = datetime.strptime(data["end_datetime"], DATE_FORMAT)
+        categories = data.get("categories") or []
+        # Without explicit split classifications, an overflowing window is split by the requested categories
+        classifications = data.get("classifications") or categories
+        category_filter = ",".join(categories) or None
+        max_pages = DEEP_PAGING_LIMIT // MAX_PAGE_SIZE
+        concurrency = data.get("page_concurrency", 5) if data.get("parallel", False) else 1
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def bounded(shard: Shard, page: int) -> Optional[bytes]:
+            async with semaphore:
+                return await self._fetch_page(city, shard, page, category_filter)
+
+        async def first_page(shard: Shard, json_data: Dict[str, Any]) -> Tuple[Shard, List[EventItem]]:
+            return shard, self.build_events(self.event_fields(event) for event in self.page_events(json_data))
+
+        async def next_page(shard: Shard, page: int) -> Tuple[Shard, List[EventItem]]:
+            payload = await bounded(shard, page)
+            return shard, await self.parse_payload(payload) if payload else []
 
         # Разбивка диапазона на интервалы по 60 дней
+        windows = []
         current = start_datetime
         while current < end_datetime:
             next_point = min(current + timedelta(days=60), end_datetime)
+            windows.append(Shard(current, next_point))
+            current = next_point
 
-            for page in range(max_pages):
-                params = {
-                    "apikey": self.api_key,
-                    "locale": "*",
-                    "city": city,
-                    "startDateTime": current.strftime('%Y-%m-%dT%H:%M:%SZ'),
-                    "endDateTime": next_point.strftime('%Y-%m-%dT%H:%M:%SZ'),
-                    "size": size,
-                    "page": page
-                }
-
-                await self.log(f"Requesting Ticketmaster page {page} for {city} | {params['startDateTime']} → {params['endDateTime']}")
-                response = requests.get(url, params=params)
-                if response.status_code == 404:
-                    break
-
-                response.raise_for_status()
-                json_data = response.json()
-
-                events = json_data.get('_embedded', {}).get('events', [])
-                if not events:
-                    break
-
-                for event in events:
-                    all_events.append(self.parse_event(event))
-
-                total_pages = json_data.get('page', {}).get('totalPages', 1)
-                if page + 1 >= total_pages:
-                    break
+        async def pages() -> AsyncIterator[Callable[[], Awaitable[Tuple[Shard, List[EventItem]]]]]:
+            # Page 0 of the next `concurrency` windows is fetched (and split while it exceeds the
+            # deep-paging cap) ahead of time, so each window's pages are ready to schedule in turn
+            upcoming = iter(windows)
+            resolving: Deque[asyncio.Task] = deque()
+
+            def refill() -> None:
+                for window in upcoming:
+                    resolving.append(asyncio.ensure_future(self._resolve(window, classifications, bounded)))
+                    if len(resolving) >= concurrency:
+                        return
+
+            try:
+                refill()
+                while resolving:
+                    shards = await resolving.popleft()
+                    refill()
+                    for shard, json_data in shards:
+                        total_pages = min(json_data.get('page', {}).get('totalPages', 1), max_pages)
+                        yield partial(first_page, shard, json_data)
+                        for page in range(1, total_pages):
+                            yield partial(next_page, shard, page)
+            finally:
+                for task in resolving:
+                    if task.done() and not task.cancelled():
+                        task.exception()
+                    task.cancel()
+
+        total = 0
+        # Pages are yielded in (window, shard, page) order, with at most `concurrency` fetched ahead
+        async for shard, events in self.prefetch(pages(), concurrency):
+            # Shards come in chronological order (classification splits share their range),
+            # so once one is being consumed everything before its start has been yielded
+            self.progress = shard.start
+            if events:
+                total += len(events)
+                yield events
+
+        await self.log(f"Parsed total {total} events from Ticketmaster")
+
+    async def _resolve(self, shard: Shard, classifications: List[str], fetch) -> List[tuple]:
+        """
+        Fetches page 0 of a shard and, while its ``page.totalElements`` exceeds
+        the deep-paging cap, bisects it by date (or, once the window is too
+        small to split, by classification).
+
+        :return: List of (shard, first page json) pairs in chronological order.
+        """
+        payload = await fetch(shard, 0)
+        json_data = self.decode(payload) if payload else None
+        if not self.page_events(json_data):
+            return []
+
+        total = json_data.get('page', {}).get('totalElements', 0)
+        if total <= DEEP_PAGING_LIMIT:
+            return [(shard, json_data)]
+
+        if shard.end - shard.start >= 2 * MIN_WINDOW:
+            middle = shard.start + (shard.end - shard.start) / 2
+            middle = middle.replace(microsecond=0)
+            halves = await asyncio.gather(
+                self._resolve(Shard(shard.start, middle, shard.classification), classifications, fetch),
+                self._resolve(Shard(middle, shard.end, shard.classification), classifications, fetch),
+            )
+            return halves[0] + halves[1]
+
+        if classifications and shard.classification is None:
+            parts = await asyncio.gather(*(
+                self._resolve(Shard(shard.start, shard.end, name), [], fetch) for name in classifications
+            ))
+            return [item for items in parts for item in items]
+
+        await self.log(
+            f"{total} events in {shard.start:%Y-%m-%d %H:%M} → {shard.end:%Y-%m-%d %H:%M} "
+            f"exceed the deep-paging cap and cannot be split further; results truncated",
+            level="WARNING"
+        )
+        return [(shard, json_data)]
+
+    async def _fetch_page(self, city: str, shard: Shard, page: int, categories: Optional[str] = None) -> Optional[bytes]:
+        params = {
+            "apikey": self.api_key,
+            "locale": "*",
+            "city": city,
+            "startDateTime": shard.start.strftime(DATE_FORMAT),
+            "endDateTime": shard.end.strftime(DATE_FORMAT),
+            "classificationName": shard.classification or categories,
+            "size": MAX_PAGE_SIZE,
+            "page": page
+        }
+
+        await self.log(
+            f"Requesting Ticketmaster page {page} for {city} | {params['startDateTime']} → {params['endDateTime']}",
+            city=city, page=page,
+        )
+        response = await self.fetch(self.base_url + EVENTS_PATH, params=params)
+        if response.status == 404:
+            return None
 
-            current = next_point
+        response.raise_for_status()
+        return response.body
 
-        await self.log(f"Parsed total {len(all_events)} events from Ticketmaster")
-        return all_events
+    def page_events(self, json_data: Optional[Dict[str, Any]]) -> List[dict]:
+        if not json_data:
+            return []
+        return json_data.get('_embedded', {}).get('events', [])
 
     def parse_event(self, event: dict) -> EventItem:
+        return EventItem(**self.event_fields(event))
+
+    def event_fields(self, event: dict) -> dict:
         venue = event.get('_embedded', {}).get('venues', [{}])[0]
         classification = event.get('classifications', [{}])[0]
         images = event.get('images', [])
 
-        return EventItem(
+        return dict(
+            source=self.source,
             source_id=event.get("id"),
             title=event.get("name"),
             url=event.get("url"),
@@ -88,8 +205,8 @@ class TicketmasterAgent(BaseAgent):
             city=venue.get("city", {}).get("name"),
             country=venue.get("country", {}).get("name"),
             venue=venue.get("name"),
-            latitude=float(venue.get("location", {}).get("latitude", 0)),
-            longitude=float(venue.get("location", {}).get("longitude", 0)),
+            latitude=_coordinate(venue.get("location", {}).get("latitude")),
+            longitude=_coordinate(venue.get("location", {}).get("longitude")),
             segment=classification.get("segment", {}).get("name"),
             genre=classification.get("genre", {}).get("name"),
             subgenre=classification.get("subGenre", {}).get("name"),
@@ -1,21 +1,23 @@
+import asyncio
 import logging
-import os
+import time
 from abc import ABC, abstractmethod
-from typing import Any, List
+from collections import deque
+from datetime import datetime
+from typing import Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Deque, Dict, Iterable, List, Optional, Union
+from urllib.parse import urlsplit
 from pydantic import BaseModel, ConfigDict
+from event_model import EventItem, build_events
+from http_transport import HttpResponse, get_transport
+from metrics import get_metrics
+from parse_pool import get_parse_pool, loads
+from rate_limiter import get_rate_limiter
+from response_cache import cache_key, get_cache
 
-# Ensure log directory exists
-os.makedirs("logs", exist_ok=True)
 
-# Configure global logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
-    handlers=[
-        logging.FileHandler("logs/agent_log.txt", encoding="utf-8"),
-        logging.StreamHandler()
-    ]
-)
+async def _as_async(items: Iterable[Any]) -> AsyncIterator[Any]:
+    for item in items:
+        yield item
 
 class BaseAgent(BaseModel, ABC):
     """
@@ -27,6 +29,11 @@ class BaseAgent(BaseModel, ABC):
     model_config = ConfigDict(arbitrary_types_allowed=True)
 
     name: str = "BaseAgent"
+    source: str = ""
+    trusted_parsing: bool = False
+    # Set by agents that yield in start-date order: every event starting before it
+    # has been yielded. Left None when the output is in no particular order.
+    progress: Optional[datetime] = None
     logger: logging.Logger = logging.getLogger("BaseAgent")
 
     @abstractmethod
@@ -39,15 +46,190 @@ class BaseAgent(BaseModel, ABC):
         """
         pass
 
-    async def log(self, message: str, level: str = "INFO") -> None:
+    async def stream(self, data: Any) -> AsyncIterator[List[Any]]:
         """
-        Logs a message at the specified level.
+        Yields processed output in page-sized batches as soon as each batch
+        is ready. Agents that can stream override this; the default yields
+        the whole result of ``process`` as a single batch.
+
+        :param data: Input data to be processed.
+        :return: Async iterator over batches of output items.
+        """
+        yield await self.process(data)
+
+    async def collect(self, data: Any) -> List[Any]:
+        """
+        Runs ``stream`` to completion and returns all items as one list.
+        Streaming agents use this to implement ``process``.
+        """
+        return [item async for batch in self.stream(data) for item in batch]
+
+    async def prefetch(
+        self,
+        pages: Union[Iterable[Callable[[], Awaitable[Any]]], AsyncIterable[Callable[[], Awaitable[Any]]]],
+        depth: int,
+    ) -> AsyncIterator[Any]:
+        """
+        Runs page coroutines with at most ``depth`` in flight and yields their
+        results in order. A finished page frees its slot only once the
+        consumer asks for the next result, so a slow consumer stops the
+        fetching instead of letting pages pile up in memory. Pages still in
+        flight are cancelled when the consumer stops early.
+
+        :param pages: Coroutine factories, one per page, in yield order; may
+            be an async iterable that does its own requests lazily.
+        :param depth: Maximum number of pages fetched ahead.
+        :return: Async iterator over the page results.
+        """
+        if not hasattr(pages, "__aiter__"):
+            pages = _as_async(pages)
+        source = pages.__aiter__()
+        window: Deque[asyncio.Future] = deque()
+        exhausted = False
+        try:
+            while True:
+                while not exhausted and len(window) < max(depth, 1):
+                    try:
+                        factory = await source.__anext__()
+                    except StopAsyncIteration:
+                        exhausted = True
+                        break
+                    window.append(asyncio.ensure_future(factory()))
+                if not window:
+                    break
+                yield await window.popleft()
+        finally:
+            for task in window:
+                if task.done() and not task.cancelled():
+                    task.exception()  # mark as retrieved; the consumer already stopped
+                task.cancel()
+            if hasattr(source, "aclose"):
+                await source.aclose()
+
+    def build_events(self, rows: Iterable[Dict[str, Any]]) -> List[EventItem]:
+        """
+        Turns a page of parsed field dicts into EventItems, skipping
+        validation when the agent runs with ``trusted_parsing``.
+
+        :param rows: Dicts of EventItem fields produced by the agent's parser.
+        :return: List of EventItem.
+        """
+        metrics = get_metrics()
+        with metrics.timer("stage_seconds", stage="parse", source=self.source):
+            events = build_events(rows, trusted=self.trusted_parsing)
+        metrics.inc("events_total", len(events), source=self.source)
+        return events
+
+    def decode(self, payload: bytes) -> Any:
+        """
+        Decodes a raw JSON response body, recording the decode time.
+        """
+        with get_metrics().timer("stage_seconds", stage="decode", source=self.source):
+            return loads(payload)
+
+    @abstractmethod
+    def page_events(self, json_data: Any) -> List[dict]:
+        """
+        Extracts the raw event dicts from one decoded response page.
+        """
+        pass
+
+    @abstractmethod
+    def event_fields(self, event: dict) -> Dict[str, Any]:
+        """
+        Maps one raw event dict to EventItem fields.
+        """
+        pass
+
+    async def parse_payload(self, payload: bytes) -> List[EventItem]:
+        """
+        Decodes and parses a raw response page. When a parse pool is
+        configured the work runs in a worker process; otherwise it runs
+        inline on the event loop.
+
+        :param payload: Raw JSON response body.
+        :return: Events of the page.
+        """
+        pool = get_parse_pool()
+        if pool is None:
+            rows = (self.event_fields(event) for event in self.page_events(self.decode(payload)))
+        else:
+            with get_metrics().timer("stage_seconds", stage="parse_worker", source=self.source):
+                rows = await pool.parse(self.source, payload)
+        return self.build_events(rows)
+
+    async def log(self, message: str, level: str = "INFO", **fields: Any) -> None:
+        """
+        Logs a message at the specified level. Only enqueues the record;
+        the logging listener thread does the I/O.
 
         :param message: The message to log.
         :param level: Logging level (e.g., INFO, WARNING, ERROR).
+        :param fields: Extra structured fields for the JSON log.
         """
         log_method = getattr(self.logger, level.lower(), self.logger.info)
-        log_method(f"{self.name}: {message}")
+        log_method(f"{self.name}: {message}", extra={"agent": self.name, "source": self.source, **fields})
+
+    async def fetch(
+        self,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> HttpResponse:
+        """
+        Sends a GET request through the shared async HTTP transport.
+        Requests pass through the shared rate limiter, and successful
+        responses are served from and stored in the response cache when
+        one is configured.
+
+        :param url: Request URL.
+        :param params: Query string parameters.
+        :param headers: Extra request headers.
+        :return: The fully read HttpResponse.
+        """
+        async def send() -> HttpResponse:
+            return await get_transport().get(url, params=params, headers=headers)
+
+        started = time.perf_counter()
+        api_key = getattr(self, "api_key", "")
+        cache = get_cache()
+        if cache is None:
+            response = await get_rate_limiter().request(self.source, api_key, send)
+            self._record_request(url, response, started, cached=False)
+            return response
+
+        key = cache_key(url, params)
+        cached = await asyncio.to_thread(cache.get, self.source, key)
+        if cached is not None:
+            self._record_request(url, cached, started, cached=True)
+            return cached
+
+        response = await get_rate_limiter().request(self.source, api_key, send)
+        await asyncio.to_thread(cache.put, self.source, key, response)
+        self._record_request(url, response, started, cached=False)
+        return response
+
+    def _record_request(self, url: str, response: HttpResponse, started: float, cached: bool) -> None:
+        latency = time.perf_counter() - started
+        endpoint = urlsplit(url).path
+        metrics = get_metrics()
+        metrics.observe("request_seconds", latency, source=self.source, endpoint=endpoint, cached=cached)
+        metrics.inc("requests_total", source=self.source, endpoint=endpoint, status=response.status, cached=cached)
+        metrics.inc("response_bytes_total", len(response.body), source=self.source, endpoint=endpoint)
+        if not self.logger.isEnabledFor(logging.DEBUG):
+            return
+        self.logger.debug(
+            f"{self.name}: GET {url} -> {response.status}",
+            extra={
+                "agent": self.name,
+                "source": self.source,
+                "request": url,
+                "status": response.status,
+                "bytes": len(response.body),
+                "cached": cached,
+                "latency_ms": round(latency * 1000, 1),
+            },
+        )
 
     async def handle_error(self, error: Exception, context: Any = None) -> None:
         """
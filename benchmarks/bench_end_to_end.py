@@ -0,0 +1,174 @@
+"""
+End-to-end benchmark of a full collection run against local mock APIs.
+
+Starts the Ticketmaster, PredictHQ and SerpApi stand-ins from mock_apis.py
+in a separate process, points every agent's base_url at them and runs the
+real pipeline from main.run() (fetch, parse, dedup, storage) into an
+in-memory Firestore. Reports events/s, p50/p99 client-side request latency
+and peak RSS. With --json the results are written together with the git
+commit, so runs on different commits can be compared.
+
+Usage: python benchmarks/bench_end_to_end.py [--events 5000] [--latency-ms 20] [--throttle-rate 0.02] [--json out.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import aiohttp  # noqa: E402
+
+from fake_firestore import FakeFirestore  # noqa: E402
+from mock_apis import start_in_process  # noqa: E402
+from logging_config import configure_logging  # noqa: E402
+from main import run  # noqa: E402
+from metrics import get_metrics  # noqa: E402
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def latency_trace(samples: List[float]) -> aiohttp.TraceConfig:
+    trace = aiohttp.TraceConfig()
+
+    async def on_start(session, context, params) -> None:
+        context.started = time.perf_counter()
+
+    async def on_end(session, context, params) -> None:
+        samples.append(time.perf_counter() - context.started)
+
+    trace.on_request_start.append(on_start)
+    trace.on_request_end.append(on_end)
+    return trace
+
+
+def bench_config(base_url: str, args: argparse.Namespace, trace: aiohttp.TraceConfig) -> dict:
+    common = {"enabled": True, "api_key": "bench", "default_city": "London", "default_days": args.days, "base_url": base_url}
+    return {
+        "ticketmaster": {**common, "default_size": 200, "parallel": True, "page_concurrency": args.concurrency, "trusted_parsing": args.trusted},
+        "predicthq": {**common, "default_size": 500, "page_concurrency": args.concurrency, "trusted_parsing": args.trusted},
+        "serpapi": {**common, "default_size": 10, "max_pages": args.serp_events // 10 + 1, "page_concurrency": 4, "trusted_parsing": args.trusted},
+        "firebase": {"batch_size": 500},
+        "http": {"limit_per_host": args.concurrency * 4, "trace_configs": [trace]},
+        "rate_limits": {"default_rate": args.client_rate},
+        "parse_pool": {"enabled": args.parse_pool},
+        "export": {"enabled": False},
+        "pipeline": {"print_events": False},
+        "metrics": {"path": None},
+    }
+
+
+async def run_once(base_url: str, args: argparse.Namespace) -> dict:
+    samples: List[float] = []
+    config = bench_config(base_url, args, latency_trace(samples))
+    db = FakeFirestore(latency_ms=args.store_latency_ms)
+    metrics = get_metrics()
+    fetched_before = metrics.total("events_total")
+    throttled_before = metrics.total("throttled_total")
+
+    started = time.perf_counter()
+    results, stats = await run(config, db)
+    elapsed = time.perf_counter() - started
+
+    fetched = sum(result.count for result in results)
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "events_fetched": fetched,
+        "events_parsed": int(metrics.total("events_total") - fetched_before),
+        "writes": stats.written,
+        "documents": len(db.documents),
+        "events_per_s": round(fetched / elapsed, 1) if elapsed else 0.0,
+        "requests": len(samples),
+        "throttled": int(metrics.total("throttled_total") - throttled_before),
+        "latency_p50_ms": round(percentile(samples, 0.50) * 1000, 2),
+        "latency_p99_ms": round(percentile(samples, 0.99) * 1000, 2),
+        "failed_jobs": sum(not result.ok for result in results),
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)), text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="End-to-end benchmark against local mock APIs")
+    parser.add_argument("--events", type=int, default=5000, help="events served by Ticketmaster and by PredictHQ each")
+    parser.add_argument("--serp-events", type=int, default=100)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--jitter-ms", type=float, default=5.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="share of requests answered with HTTP 429")
+    parser.add_argument("--store-latency-ms", type=float, default=0.0, help="simulated Firestore round trip")
+    parser.add_argument("--concurrency", type=int, default=8, help="page concurrency per agent")
+    parser.add_argument("--client-rate", type=float, default=200.0, help="client-side rate limit per source, req/s")
+    parser.add_argument("--parse-pool", action="store_true")
+    parser.add_argument("--trusted", action="store_true", help="use trusted (non-validating) parsing")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    configure_logging(level="WARNING", path=None)
+    server, base_url = start_in_process(
+        events=args.events, serp_events=args.serp_events, days=args.days,
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, throttle_rate=args.throttle_rate,
+    )
+    try:
+        runs = []
+        for number in range(args.runs):
+            result = asyncio.run(run_once(base_url, args))
+            runs.append(result)
+            print(
+                f"run {number + 1}: {result['events_fetched']} events in {result['elapsed_s']:.2f}s "
+                f"({result['events_per_s']:,.0f} events/s), {result['documents']} unique stored, {result['requests']} requests, "
+                f"p50 {result['latency_p50_ms']:.1f} ms, p99 {result['latency_p99_ms']:.1f} ms, "
+                f"{result['throttled']} throttled, {result['failed_jobs']} failed jobs"
+            )
+    finally:
+        server.terminate()
+
+    summary = {
+        "events_per_s": statistics.median(run["events_per_s"] for run in runs),
+        "latency_p50_ms": statistics.median(run["latency_p50_ms"] for run in runs),
+        "latency_p99_ms": statistics.median(run["latency_p99_ms"] for run in runs),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+    print(
+        f"median: {summary['events_per_s']:,.0f} events/s, p50 {summary['latency_p50_ms']:.1f} ms, "
+        f"p99 {summary['latency_p99_ms']:.1f} ms, peak RSS {summary['peak_rss_mb']:.0f} MB"
+    )
+
+    if args.json:
+        report = {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "args": vars(args),
+            "summary": summary,
+            "runs": runs,
+        }
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
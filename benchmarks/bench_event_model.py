@@ -0,0 +1,62 @@
+"""
+Micro-benchmark for EventItem construction.
+
+Compares validated and trusted (non-validating) construction on synthetic
+Ticketmaster-shaped events with a dozen image URLs each.
+
+Usage: python benchmarks/bench_event_model.py [count]
+"""
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from event_model import build_events  # noqa: E402
+
+
+def make_rows(count: int) -> list:
+    start = datetime(2026, 1, 1)
+    return [
+        dict(
+            source="ticketmaster",
+            source_id=f"G5v{i:08d}",
+            title=f"Event {i}",
+            url=f"https://www.ticketmaster.co.uk/event/{i}",
+            start_date=start + timedelta(hours=i),
+            timezone="Europe/London",
+            city="London",
+            country="Great Britain",
+            venue=f"Venue {i % 300}",
+            latitude=51.5 + (i % 100) / 1000,
+            longitude=-0.12 - (i % 100) / 1000,
+            segment="Music",
+            genre="Rock",
+            category="theatre",
+            labels=["theatre"],
+            image_urls=[f"https://s1.ticketm.net/dam/a/{i}/{n}_RETINA_PORTRAIT_3_2.jpg" for n in range(12)],
+            ticket_urls=[f"https://www.ticketmaster.co.uk/event/{i}"],
+        )
+        for i in range(count)
+    ]
+
+
+def bench(label: str, func, rows: list) -> None:
+    started = time.perf_counter()
+    events = func(rows)
+    elapsed = time.perf_counter() - started
+    assert len(events) == len(rows)
+    print(f"{label:<24} {len(rows) / elapsed:>12,.0f} events/s  ({elapsed * 1000:.1f} ms)")
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    rows = make_rows(count)
+    print(f"EventItem construction, {count} events")
+    bench("validated build_events", lambda rs: build_events(rs), rows)
+    bench("trusted model_construct", lambda rs: build_events(rs, trusted=True), rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Micro-benchmarks and memory budgets for the per-event hot paths.
+
+Cases:
+
+    tm_parse_event     TicketmasterAgent.parse_event on raw Discovery events
+    serp_date_parse    SerpApi year guessing for "Jan 5"-style dates
+    event_build_dump   build_events() plus model_dump(mode="json")
+    dedup_keys         document_id, content_hash and dedup title tokens
+
+Each case runs over a generated corpus of N events (10k, 100k and 1M by
+default). Inputs are built once per chunk of up to 10k events from
+corpus.py and cycled, so a 1M run measures 1M operations without holding
+1M raw events in memory. Time is reported as ns/op; a separate
+tracemalloc pass over one chunk reports the peak traced memory and the
+number of memory blocks still held by the results, both per op.
+
+With a budgets file (benchmarks/micro_budgets.json by default) any case
+over its ``ns_per_op``, ``peak_bytes_per_op`` or ``blocks_per_op`` limit
+is listed and the script exits with status 1, so it can gate CI.
+
+Usage: python benchmarks/bench_micro.py [--sizes 10000,100000,1000000] [--cases tm_parse_event,...] [--budgets FILE | --no-budgets] [--json out.json]
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, NamedTuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from corpus import make_shows, serpapi_event, ticketmaster_event  # noqa: E402
+from logging_config import configure_logging  # noqa: E402
+from agents.agent_serpapi import guess_start_date  # noqa: E402
+from agents.agent_ticketmaster import TicketmasterAgent  # noqa: E402
+from dedup import title_tokens  # noqa: E402
+from event_keys import content_hash, document_id  # noqa: E402
+from event_model import build_events  # noqa: E402
+
+CHUNK_SIZE = 10000
+DEFAULT_SIZES = "10000,100000,1000000"
+DEFAULT_BUDGETS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "micro_budgets.json")
+CORPUS_START = datetime(2026, 1, 1)
+CORPUS_DAYS = 90
+
+
+class Case(NamedTuple):
+    # Builds the inputs for one chunk of ``count`` events
+    setup: Callable[[int], list]
+    # Runs the operation over a chunk and returns the results, kept alive for the memory pass
+    run: Callable[[list], list]
+
+
+def _shows(count: int) -> list:
+    return make_shows(count, CORPUS_START, CORPUS_DAYS)
+
+
+def _tm_agent() -> TicketmasterAgent:
+    return TicketmasterAgent(api_key="bench")
+
+
+def _serp_dates(count: int) -> list:
+    return [serpapi_event(show)["date"]["start_date"] for show in _shows(count)]
+
+
+def _tm_rows(count: int) -> list:
+    agent = _tm_agent()
+    return [agent.event_fields(ticketmaster_event(show)) for show in _shows(count)]
+
+
+def _tm_events(count: int) -> list:
+    return build_events(_tm_rows(count))
+
+
+def _serp_guess(dates: list) -> list:
+    start_dt = CORPUS_START.replace(tzinfo=timezone.utc)
+    end_dt = start_dt + timedelta(days=CORPUS_DAYS)
+    return [guess_start_date(raw_date, start_dt, end_dt) for raw_date in dates]
+
+
+def _build_dump(rows: list) -> list:
+    return [event.model_dump(mode="json") for event in build_events(rows)]
+
+
+def _dedup_keys(events: list) -> list:
+    return [(document_id(event), content_hash(event), title_tokens(event.title)) for event in events]
+
+
+def _cases() -> Dict[str, Case]:
+    agent = _tm_agent()
+    return {
+        "tm_parse_event": Case(lambda count: [ticketmaster_event(show) for show in _shows(count)], lambda raw: [agent.parse_event(event) for event in raw]),
+        "serp_date_parse": Case(_serp_dates, _serp_guess),
+        "event_build_dump": Case(_tm_rows, _build_dump),
+        "dedup_keys": Case(_tm_events, _dedup_keys),
+    }
+
+
+def measure(case: Case, size: int) -> dict:
+    inputs = case.setup(min(size, CHUNK_SIZE))
+
+    # Timing pass: cycle the chunk until ``size`` operations have run
+    gc.collect()
+    remaining = size
+    started = time.perf_counter_ns()
+    while remaining > 0:
+        chunk = inputs if remaining >= len(inputs) else inputs[:remaining]
+        case.run(chunk)
+        remaining -= len(chunk)
+    elapsed = time.perf_counter_ns() - started
+
+    # Memory pass over one chunk, with the results held until the snapshot
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    baseline, _ = tracemalloc.get_traced_memory()
+    results = case.run(inputs)
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename"))
+    del results
+
+    return {
+        "size": size,
+        "elapsed_s": round(elapsed / 1e9, 3),
+        "ns_per_op": round(elapsed / size),
+        "peak_bytes_per_op": round((peak - baseline) / len(inputs)),
+        "peak_chunk_mb": round((peak - baseline) / (1024 * 1024), 1),
+        "blocks_per_op": round(blocks / len(inputs), 1),
+    }
+
+
+def check_budgets(results: Dict[str, List[dict]], budgets: Dict[str, Dict[str, float]]) -> List[str]:
+    """
+    :return: One message per measurement over its case's budget.
+    """
+    failures = []
+    for name, runs in results.items():
+        for metric, limit in budgets.get(name, {}).items():
+            for result in runs:
+                if metric in result and result[metric] > limit:
+                    failures.append(f"{name} @ {result['size']:,}: {metric} {result[metric]:,} > budget {limit:,}")
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Micro-benchmarks and memory budgets for the parse, model and dedup paths")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="comma-separated corpus sizes")
+    parser.add_argument("--cases", help="comma-separated case names (default: all)")
+    parser.add_argument("--budgets", default=DEFAULT_BUDGETS, help="JSON file of {case: {metric: limit}}")
+    parser.add_argument("--no-budgets", action="store_true", help="report only, never fail")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    configure_logging(level="WARNING", path=None)
+    cases = _cases()
+    names = args.cases.split(",") if args.cases else list(cases)
+    unknown = [name for name in names if name not in cases]
+    if unknown:
+        parser.error(f"unknown case(s): {', '.join(unknown)}; choose from {', '.join(cases)}")
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    results: Dict[str, List[dict]] = {}
+    print(f"{'case':<18} {'events':>10} {'ns/op':>10} {'peak B/op':>10} {'blocks/op':>10} {'peak/chunk':>11}")
+    for name in names:
+        for size in sizes:
+            result = measure(cases[name], size)
+            results.setdefault(name, []).append(result)
+            print(
+                f"{name:<18} {size:>10,} {result['ns_per_op']:>10,} {result['peak_bytes_per_op']:>10,} "
+                f"{result['blocks_per_op']:>10,} {result['peak_chunk_mb']:>8.1f} MB"
+            )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+    if args.no_budgets:
+        return
+    with open(args.budgets, encoding="utf-8") as file:
+        budgets = json.load(file)
+    failures = check_budgets(results, budgets)
+    if failures:
+        print(f"\n{len(failures)} budget(s) exceeded:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print("\nAll budgets met")
+
+
+if __name__ == "__main__":
+    main()
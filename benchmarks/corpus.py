@@ -0,0 +1,108 @@
+"""
+Deterministic synthetic event corpora in the raw response shapes of the
+Ticketmaster Discovery, PredictHQ and SerpApi Google Events APIs.
+
+Every source draws from one pool of "shows", so the same show can appear
+in several sources (with slightly different titles, venue names and
+coordinates) and exercises cross-source dedup the way real data does.
+"""
+import random
+from datetime import datetime, timedelta
+from typing import List, NamedTuple
+
+WORDS = (
+    "hamilton", "phantom", "opera", "wicked", "lion", "king", "mamma", "mia", "matilda", "cabaret",
+    "coldplay", "adele", "arctic", "monkeys", "jazz", "night", "orchestra", "symphony", "comedy", "gala",
+    "ballet", "swan", "lake", "nutcracker", "festival", "rock", "indie", "classics", "legends", "tribute",
+)
+VENUES = (
+    ("Victoria Palace Theatre", 51.4965, -0.1427), ("Royal Albert Hall", 51.5009, -0.1774),
+    ("The O2 Arena", 51.5030, 0.0032), ("Wembley Stadium", 51.5560, -0.2796),
+    ("Apollo Victoria Theatre", 51.4958, -0.1430), ("Barbican Centre", 51.5202, -0.0938),
+    ("Southbank Centre", 51.5067, -0.1166), ("London Palladium", 51.5142, -0.1400),
+    ("Roundhouse", 51.5433, -0.1519), ("Hammersmith Apollo", 51.4908, -0.2246),
+)
+SEGMENTS = (("Music", "Rock"), ("Arts & Theatre", "Musical"), ("Sports", "Football"), ("Arts & Theatre", "Comedy"))
+PHQ_CATEGORIES = ("concerts", "performing-arts", "sports", "festivals")
+
+
+class Show(NamedTuple):
+    index: int
+    title: str
+    venue: int
+    start: datetime
+    segment: int
+
+
+def make_shows(count: int, start: datetime, days: int, seed: int = 0) -> List[Show]:
+    """
+    Generates shows with start times spread over ``days``, sorted by start.
+    """
+    rng = random.Random(seed)
+    shows = []
+    for index in range(count):
+        title = " ".join(rng.sample(WORDS, rng.randint(2, 4))).title()
+        offset = timedelta(minutes=rng.randrange(days * 24 * 60) // 15 * 15)
+        shows.append(Show(index, f"{title} {index}", rng.randrange(len(VENUES)), start + offset, rng.randrange(len(SEGMENTS))))
+    shows.sort(key=lambda show: show.start)
+    return shows
+
+
+def ticketmaster_event(show: Show) -> dict:
+    venue, lat, lon = VENUES[show.venue]
+    segment, genre = SEGMENTS[show.segment]
+    url = f"https://www.ticketmaster.co.uk/event/{show.index:08d}"
+    return {
+        "name": show.title,
+        "type": "event",
+        "id": f"G5v{show.index:010d}",
+        "url": url,
+        "images": [
+            {"ratio": "3_2", "url": f"https://s1.ticketm.net/dam/a/{show.index % 997:03d}/{n}_RETINA_PORTRAIT_3_2.jpg", "width": 640}
+            for n in range(10)
+        ],
+        "sales": {"public": {"startDateTime": (show.start - timedelta(days=60)).strftime("%Y-%m-%dT%H:%M:%SZ"), "endDateTime": show.start.strftime("%Y-%m-%dT%H:%M:%SZ")}},
+        "dates": {"start": {"localDate": show.start.strftime("%Y-%m-%d"), "dateTime": show.start.strftime("%Y-%m-%dT%H:%M:%SZ")}, "timezone": "Europe/London"},
+        "classifications": [{"primary": True, "segment": {"name": segment}, "genre": {"name": genre}, "subGenre": {"name": "Other"}}],
+        "promoter": {"id": "494", "name": "PROMOTED BY VENUE"},
+        "_embedded": {"venues": [{
+            "name": venue,
+            "city": {"name": "London"},
+            "country": {"name": "Great Britain", "countryCode": "GB"},
+            "location": {"longitude": f"{lon:.6f}", "latitude": f"{lat:.6f}"},
+        }]},
+    }
+
+
+def predicthq_event(show: Show) -> dict:
+    venue, lat, lon = VENUES[show.venue]
+    return {
+        "id": f"phq{show.index:012d}",
+        "title": show.title,
+        "description": f"{show.title} live at {venue}",
+        "category": PHQ_CATEGORIES[show.segment],
+        "labels": [PHQ_CATEGORIES[show.segment], "entertainment"],
+        "start": show.start.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "duration": 7200,
+        "timezone": "Europe/London",
+        # PredictHQ gives [lon, lat], geocoded slightly off the venue's own coordinates
+        "location": [round(lon + 0.0003, 6), round(lat - 0.0002, 6)],
+        "geo": {"address": {"locality": "London", "country_code": "GB"}},
+        "entities": [{"entity_id": f"v{show.venue}", "name": venue.replace("The ", ""), "type": "venue"}],
+        "phq_attendance": 500 + show.index % 5000,
+        "predicted_event_spend": float(10000 + show.index % 90000),
+    }
+
+
+def serpapi_event(show: Show) -> dict:
+    venue, _, _ = VENUES[show.venue]
+    return {
+        "title": show.title,
+        "date": {"start_date": show.start.strftime("%b %-d"), "when": show.start.strftime("%a, %b %-d, %-I:%M %p")},
+        "address": [venue, "London, UK"],
+        "link": f"https://www.example-tickets.com/e/{show.index}",
+        "venue": {"name": venue, "rating": 4.6, "reviews": 1200},
+        "ticket_info": [{"source": "Ticketmaster", "link": f"https://www.ticketmaster.co.uk/event/{show.index:08d}", "link_type": "tickets"}],
+        "thumbnail": f"https://serpapi.com/searches/thumb/{show.index}.jpeg",
+        "description": f"{show.title} at {venue}",
+    }
@@ -0,0 +1,75 @@
+"""
+In-memory stand-in for the parts of the Firestore client that
+FirestoreWriter uses (collection/document refs, WriteBatch and get_all),
+with an optional per-call latency to mimic network round trips.
+"""
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+
+class FakeDocumentRef:
+    def __init__(self, db: "FakeFirestore", collection: str, document_id: str):
+        self.db = db
+        self.collection = collection
+        self.id = document_id
+
+
+class FakeSnapshot:
+    def __init__(self, document_id: str, data: Optional[dict]):
+        self.id = document_id
+        self.exists = data is not None
+        self._data = data or {}
+
+    def get(self, field: str) -> Any:
+        return self._data.get(field)
+
+
+class FakeCollection:
+    def __init__(self, db: "FakeFirestore", name: str):
+        self.db = db
+        self.name = name
+
+    def document(self, document_id: str) -> FakeDocumentRef:
+        return FakeDocumentRef(self.db, self.name, document_id)
+
+
+class FakeBatch:
+    def __init__(self, db: "FakeFirestore"):
+        self.db = db
+        self.writes: List[tuple] = []
+
+    def set(self, ref: FakeDocumentRef, data: dict) -> None:
+        self.writes.append((ref, data))
+
+    def commit(self) -> None:
+        self.db.round_trip()
+        with self.db.lock:
+            for ref, data in self.writes:
+                self.db.documents[(ref.collection, ref.id)] = data
+            self.db.commits += 1
+
+
+class FakeFirestore:
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency = latency_ms / 1000
+        self.documents: Dict[tuple, dict] = {}
+        self.commits = 0
+        self.reads = 0
+        self.lock = threading.Lock()
+
+    def round_trip(self) -> None:
+        if self.latency:
+            time.sleep(self.latency)
+
+    def collection(self, name: str) -> FakeCollection:
+        return FakeCollection(self, name)
+
+    def batch(self) -> FakeBatch:
+        return FakeBatch(self)
+
+    def get_all(self, refs: Iterable[FakeDocumentRef], field_paths: Optional[List[str]] = None) -> List[FakeSnapshot]:
+        self.round_trip()
+        with self.lock:
+            self.reads += 1
+            return [FakeSnapshot(ref.id, self.documents.get((ref.collection, ref.id))) for ref in refs]
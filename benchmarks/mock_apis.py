@@ -0,0 +1,256 @@
+"""
+Local stand-in for the Ticketmaster Discovery, PredictHQ and SerpApi
+endpoints, serving synthetic (or recorded) events with configurable
+latency, paging and throttling.
+
+All three APIs are served from one aiohttp app, so every agent's
+``base_url`` can point at the same address:
+
+    /discovery/v2/events.json   Ticketmaster (page/size paging, 1000-result cap)
+    /v1/events/                 PredictHQ (offset/limit paging with count and next)
+    /search                     SerpApi Google Events (start offset, 10 per page)
+
+Usage: python benchmarks/mock_apis.py [--port 8765] [--events 5000] [--latency-ms 20] ...
+"""
+import argparse
+import asyncio
+import bisect
+import json
+import multiprocessing
+import random
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+from corpus import SEGMENTS, make_shows, predicthq_event, serpapi_event, ticketmaster_event
+
+TM_DEEP_PAGING_LIMIT = 1000
+PHQ_MAX_RESULTS = 10000
+SERP_PAGE_SIZE = 10
+
+
+def _parse_time(value: str) -> datetime:
+    return datetime.strptime(value, "%Y-%m-%dT%H:%M:%SZ")
+
+
+class _Source:
+    """
+    Pre-serialized events of one source, sorted by start time, so a
+    request only costs a bisect and a bytes join.
+    """
+
+    def __init__(self, events: List[dict], starts: List[datetime], segments: List[str]):
+        self.bodies = [json.dumps(event, separators=(",", ":")).encode() for event in events]
+        self.starts = starts
+        self.segments = segments
+
+    def window(self, start: Optional[datetime], end: Optional[datetime], segment: Optional[str] = None) -> List[bytes]:
+        low = bisect.bisect_left(self.starts, start) if start else 0
+        high = bisect.bisect_right(self.starts, end) if end else len(self.starts)
+        if segment is None:
+            return self.bodies[low:high]
+        return [body for body, name in zip(self.bodies[low:high], self.segments[low:high]) if name.lower() == segment.lower()]
+
+
+class MockApis:
+    def __init__(
+        self,
+        events: int = 5000,
+        serp_events: int = 100,
+        days: int = 90,
+        overlap: float = 0.3,
+        latency_ms: float = 20.0,
+        jitter_ms: float = 5.0,
+        throttle_rate: float = 0.0,
+        retry_after: float = 0.05,
+        start: Optional[datetime] = None,
+        seed: int = 0,
+        recorded: Optional[Dict[str, str]] = None,
+    ):
+        """
+        :param events: Events served by Ticketmaster and by PredictHQ each.
+        :param serp_events: Events served by SerpApi.
+        :param days: Span of event start times, from ``start``.
+        :param overlap: Share of PredictHQ events that are also on Ticketmaster.
+        :param latency_ms: Base response latency.
+        :param jitter_ms: Uniform random extra latency.
+        :param throttle_rate: Share of requests answered with HTTP 429.
+        :param retry_after: Retry-After sent with 429s, in seconds.
+        :param recorded: Optional {source: path} of recorded response pages
+            whose events are served instead of the synthetic ones.
+        """
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+        self.requests: Dict[str, int] = {"ticketmaster": 0, "predicthq": 0, "serpapi": 0}
+        self.throttled = 0
+
+        start = start or datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        first_phq = int(events * (1 - overlap))
+        shows = make_shows(first_phq + events, start, days, seed)
+        # Shows are sorted by start; pick each source's share by show index
+        tm_shows = [show for show in shows if show.index < events]
+        phq_shows = [show for show in shows if first_phq <= show.index < first_phq + events]
+        serp_shows = [show for show in shows if show.index < serp_events]
+
+        def build(source_shows, make_event) -> _Source:
+            return _Source(
+                [make_event(show) for show in source_shows],
+                [show.start for show in source_shows],
+                [SEGMENTS[show.segment][0] for show in source_shows],
+            )
+
+        self.sources = {
+            "ticketmaster": build(tm_shows, ticketmaster_event),
+            "predicthq": build(phq_shows, predicthq_event),
+            "serpapi": build(serp_shows, serpapi_event),
+        }
+        for source, path in (recorded or {}).items():
+            self.sources[source] = self._load_recorded(source, path)
+
+    @staticmethod
+    def _load_recorded(source: str, path: str) -> _Source:
+        with open(path, encoding="utf-8") as file:
+            page = json.load(file)
+        if source == "ticketmaster":
+            events = page.get("_embedded", {}).get("events", [])
+            starts = [_parse_time(event["dates"]["start"]["dateTime"]) for event in events]
+            segments = [event.get("classifications", [{}])[0].get("segment", {}).get("name", "") for event in events]
+        elif source == "predicthq":
+            events = page.get("results", [])
+            starts = [_parse_time(event["start"]) for event in events]
+            segments = [event.get("category", "") for event in events]
+        else:
+            events = page.get("events_results", [])
+            starts = [datetime.min] * len(events)
+            segments = [""] * len(events)
+        order = sorted(range(len(events)), key=lambda i: starts[i])
+        return _Source([events[i] for i in order], [starts[i] for i in order], [segments[i] for i in order])
+
+    async def _delay(self, source: str) -> Optional[web.Response]:
+        self.requests[source] += 1
+        await asyncio.sleep(self.latency + self.rng.uniform(0, self.jitter))
+        if self.throttle_rate and self.rng.random() < self.throttle_rate:
+            self.throttled += 1
+            return web.json_response({"fault": "Rate limit quota violation"}, status=429, headers={"Retry-After": f"{self.retry_after:g}"})
+        return None
+
+    async def ticketmaster(self, request: web.Request) -> web.Response:
+        throttled = await self._delay("ticketmaster")
+        if throttled is not None:
+            return throttled
+        query = request.query
+        size = int(query.get("size", 20))
+        page = int(query.get("page", 0))
+        if (page + 1) * size > TM_DEEP_PAGING_LIMIT:
+            return web.json_response({"errors": [{"code": "DIS1035", "detail": "API Limits Exceeded"}]}, status=400)
+        start = _parse_time(query["startDateTime"]) if "startDateTime" in query else None
+        end = _parse_time(query["endDateTime"]) if "endDateTime" in query else None
+        bodies = self.sources["ticketmaster"].window(start, end, query.get("classificationName"))
+        total = len(bodies)
+        chunk = bodies[page * size:(page + 1) * size]
+        meta = json.dumps({"size": size, "totalElements": total, "totalPages": -(-total // size), "number": page}).encode()
+        body = b'{"page":' + meta + b"}" if not chunk else b'{"_embedded":{"events":[' + b",".join(chunk) + b']},"page":' + meta + b"}"
+        return web.Response(body=body, content_type="application/json")
+
+    async def predicthq(self, request: web.Request) -> web.Response:
+        throttled = await self._delay("predicthq")
+        if throttled is not None:
+            return throttled
+        query = request.query
+        limit = int(query.get("limit", 10))
+        offset = int(query.get("offset", 0))
+        start = _parse_time(query["start.gte"]) if "start.gte" in query else None
+        end = _parse_time(query["start.lte"]) if "start.lte" in query else None
+        bodies = self.sources["predicthq"].window(start, end)
+        count = len(bodies)
+        chunk = bodies[offset:offset + limit] if offset < PHQ_MAX_RESULTS else []
+        next_url = None
+        if offset + limit < min(count, PHQ_MAX_RESULTS):
+            next_url = str(request.url.update_query({"offset": offset + limit}))
+        meta = json.dumps({"count": count, "overflow": count > PHQ_MAX_RESULTS, "next": next_url, "previous": None})
+        body = meta[:-1].encode() + b',"results":[' + b",".join(chunk) + b"]}"
+        return web.Response(body=body, content_type="application/json")
+
+    async def serpapi(self, request: web.Request) -> web.Response:
+        throttled = await self._delay("serpapi")
+        if throttled is not None:
+            return throttled
+        start = int(request.query.get("start", 0))
+        chunk = self.sources["serpapi"].bodies[start:start + SERP_PAGE_SIZE]
+        if not chunk:
+            return web.json_response({"error": "Google hasn't returned any results for this query."})
+        body = b'{"search_metadata":{"status":"Success"},"events_results":[' + b",".join(chunk) + b"]}"
+        return web.Response(body=body, content_type="application/json")
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/discovery/v2/events.json", self.ticketmaster)
+        app.router.add_get("/v1/events/", self.predicthq)
+        app.router.add_get("/search", self.serpapi)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> Tuple[web.AppRunner, str]:
+        """
+        Starts serving on the current event loop.
+
+        :return: The runner (call ``cleanup()`` to stop) and the base URL.
+        """
+        runner = web.AppRunner(self.app(), access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, host, port)
+        await site.start()
+        bound_host, bound_port = runner.addresses[0][:2]
+        return runner, f"http://{bound_host}:{bound_port}"
+
+
+def _serve(ready: "multiprocessing.Queue", options: dict) -> None:
+    async def main() -> None:
+        _, base_url = await MockApis(**options).start()
+        ready.put(base_url)
+        await asyncio.Event().wait()
+
+    asyncio.run(main())
+
+
+def start_in_process(**options) -> Tuple[multiprocessing.Process, str]:
+    """
+    Runs the mock APIs in a separate process, so serving them does not
+    compete with the client under test for the event loop or the GIL.
+
+    :return: The server process (terminate it when done) and its base URL.
+    """
+    ready: multiprocessing.Queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_serve, args=(ready, options), daemon=True)
+    process.start()
+    return process, ready.get(timeout=120)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--serp-events", type=int, default=100)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--jitter-ms", type=float, default=5.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    async def serve() -> None:
+        mock = MockApis(
+            events=args.events, serp_events=args.serp_events, days=args.days,
+            latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, throttle_rate=args.throttle_rate,
+        )
+        _, base_url = await mock.start(port=args.port)
+        print(f"Mock APIs serving on {base_url}")
+        await asyncio.Event().wait()
+
+    asyncio.run(serve())
+
+
+if __name__ == "__main__":
+    main()
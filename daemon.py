@@ -0,0 +1,316 @@
+import argparse
+import asyncio
+import heapq
+import logging
+import math
+import signal
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+from config_loader import load_config
+from dedup import DedupEngine
+from http_transport import close_transport
+from logging_config import close_logging, configure_logging
+from event_model import EventItem
+from main import build_pipeline, configure_shared, init_firestore, open_export, open_storage, record_job_metrics
+from metrics import close_metrics, flush_metrics, get_metrics
+from parse_pool import close_parse_pool
+from pipeline import Stage
+from response_cache import round_now
+from scheduler import BatchQuery, JobResult, SourceScheduler, build_jobs, load_queries
+
+# Near-term events change (sell-outs, reschedules, new dates) far more often than ones months away
+DEFAULT_BANDS = (
+    {"days": 2, "every_minutes": 15},
+    {"days": 7, "every_minutes": 60},
+    {"days": 30, "every_minutes": 6 * 60},
+    {"days": 365, "every_minutes": 24 * 60},
+)
+
+
+class Band(NamedTuple):
+    start_days: float
+    end_days: float
+    interval: float
+
+
+def parse_bands(entries: Sequence[Dict[str, float]]) -> List[Band]:
+    """
+    Turns ``[{days, every_minutes}, ...]`` into consecutive horizon bands:
+    each covers the days from the end of the previous band up to ``days``.
+    """
+    bands = []
+    start = 0.0
+    for entry in sorted(entries, key=lambda item: item["days"]):
+        bands.append(Band(start, float(entry["days"]), entry["every_minutes"] * 60.0))
+        start = float(entry["days"])
+    return bands
+
+
+@dataclass(order=True)
+class RefreshTask:
+    """
+    One query's date band, due for refresh at ``due`` (monotonic seconds).
+    """
+
+    due: float
+    seq: int
+    query: BatchQuery = field(compare=False)
+    band: Band = field(compare=False)
+
+    @property
+    def interval(self) -> float:
+        # A query with priority 2 (a busy city) is refreshed twice as often
+        return self.band.interval / max(self.query.priority, 0.01)
+
+
+class RefreshQueue:
+    """
+    Min-heap of refresh tasks ordered by due time; ties go to the task
+    scheduled first, and initial tasks are scheduled shortest interval first.
+    """
+
+    def __init__(self):
+        self._heap: List[RefreshTask] = []
+        self._seq = 0
+
+    def push(self, query: BatchQuery, band: Band, due: float) -> None:
+        heapq.heappush(self._heap, RefreshTask(due, self._seq, query, band))
+        self._seq += 1
+
+    def next_due(self) -> Optional[float]:
+        return self._heap[0].due if self._heap else None
+
+    def pop_due(self, now: float, limit: Optional[int] = None) -> List[RefreshTask]:
+        tasks = []
+        while self._heap and self._heap[0].due <= now and (limit is None or len(tasks) < limit):
+            tasks.append(heapq.heappop(self._heap))
+        return tasks
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+
+class _RoundStage(Stage):
+    """
+    Puts a stage that outlives the rounds into a round's pipeline: the end
+    of a round only flushes it, and the daemon closes it on shutdown.
+    """
+
+    def __init__(self, stage: Stage):
+        self.stage = stage
+        self.name = stage.name
+
+    async def process(self, batch: List[EventItem]) -> List[EventItem]:
+        return await self.stage.process(batch)
+
+    async def close(self) -> None:
+        await self.stage.flush()
+
+
+class EventDaemon:
+    """
+    Long-running collector. Every query's horizon is split into date bands
+    that are refreshed on their own schedule, so near-term windows and
+    high-priority cities are re-fetched often and far-future windows rarely.
+
+    The last band also covers any horizon beyond its ``days``. Sources
+    without a date filter (SerpApi) fetch their whole horizon at once, in
+    the band that holds its end.
+
+    The HTTP transport, rate limiter, parse pool, Firestore writer, seen
+    index and export files stay open between rounds. So does the dedup
+    engine, in retain mode: events of one round, SerpApi's in particular,
+    are merged into the clusters already stored by others instead of being
+    stored again. SIGTERM/SIGINT stop new rounds, let the current one finish
+    for up to ``drain_seconds`` and flush all stages.
+    """
+
+    def __init__(
+        self,
+        config: dict,
+        db: Any,
+        queries: Optional[List[BatchQuery]] = None,
+        bands: Sequence[Dict[str, float]] = DEFAULT_BANDS,
+        max_queries_per_round: Optional[int] = 20,
+        drain_seconds: float = 60.0,
+        retry_minutes: float = 5.0,
+        keepalive_seconds: float = 300.0,
+        compact_hours: float = 24.0,
+    ):
+        """
+        :param config: Loaded config.yaml.
+        :param db: Firestore client, or anything with the same API.
+        :param queries: Queries to keep fresh; defaults to each source's default city.
+        :param bands: ``[{days, every_minutes}, ...]`` refresh schedule by horizon.
+        :param max_queries_per_round: Cap on band refreshes per round, so one
+            round never holds back newly due near-term bands for long.
+        :param drain_seconds: Grace period for the current round on shutdown.
+        :param retry_minutes: Delay before retrying a band whose jobs failed.
+        :param keepalive_seconds: Idle keep-alive for pooled connections between
+            rounds, unless ``http.keepalive_timeout`` is set.
+        :param compact_hours: How often the seen index is compacted.
+        """
+        self.config = config
+        self.db = db
+        self.queries = queries or [BatchQuery()]
+        self.bands = parse_bands(bands)
+        if not self.bands:
+            raise ValueError("The daemon needs at least one refresh band")
+        self.max_queries_per_round = max_queries_per_round
+        self.drain_seconds = drain_seconds
+        self.retry = retry_minutes * 60
+        self.keepalive_seconds = keepalive_seconds
+        self.compact_interval = compact_hours * 3600
+        self.queue = RefreshQueue()
+        self.export: Optional[Stage] = None
+        self.dedup: Optional[DedupEngine] = None
+        self.logger = logging.getLogger("EventDaemon")
+        self._stopping = asyncio.Event()
+
+    def stop(self) -> None:
+        if not self._stopping.is_set():
+            self.logger.info("Shutdown requested, draining the current round")
+        self._stopping.set()
+
+    def _schedule_all(self, now: float) -> None:
+        tasks = [(query, band) for query in self.queries for band in self.bands]
+        for query, band in sorted(tasks, key=lambda task: task[1].interval / max(task[0].priority, 0.01)):
+            self.queue.push(query, band, now)
+
+    async def run_round(self, tasks: List[RefreshTask]) -> List[bool]:
+        """
+        Refreshes the given bands in one pipeline run.
+
+        :return: For each task, whether all of its jobs succeeded.
+        """
+        cache_config = self.config.get("cache", {})
+        now = round_now(datetime.utcnow(), cache_config.get("now_rounding_minutes", 0))
+        jobs, owners = [], []
+        if self.dedup is not None:
+            self.dedup.expire(now)
+        for index, task in enumerate(tasks):
+            end_days = math.inf if task.band == self.bands[-1] else task.band.end_days
+            task_jobs = build_jobs(self.config, now, None, [task.query], (task.band.start_days, end_days))
+            jobs.extend(task_jobs)
+            owners.extend([index] * len(task_jobs))
+
+        started = time.perf_counter()
+        written_before = self.writer.stats.written
+        export = _RoundStage(self.export) if self.export is not None else None
+        pipeline = build_pipeline(self.config, self.writer, self.seen_index, export, self.dedup)
+        results: List[JobResult] = await pipeline.run(self.scheduler, jobs)
+
+        ok = [True] * len(tasks)
+        for owner, result in zip(owners, results):
+            record_job_metrics(result)
+            ok[owner] = ok[owner] and result.ok
+        metrics = get_metrics()
+        metrics.inc("daemon_rounds_total")
+        metrics.observe("daemon_round_seconds", time.perf_counter() - started)
+        flush_metrics()
+        self.logger.info(
+            f"Refreshed {len(tasks)} band(s) in {time.perf_counter() - started:.1f}s: "
+            f"{sum(result.count for result in results)} events, {self.writer.stats.written - written_before} written, "
+            f"{sum(not result.ok for result in results)} failed job(s)"
+        )
+        return ok
+
+    async def _wait(self, seconds: float) -> None:
+        try:
+            await asyncio.wait_for(self._stopping.wait(), timeout=max(seconds, 0))
+        except asyncio.TimeoutError:
+            pass
+
+    async def serve(self) -> None:
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(signum, self.stop)
+            except (NotImplementedError, RuntimeError):
+                pass
+
+        http_config = self.config.setdefault("http", {})
+        http_config.setdefault("keepalive_timeout", self.keepalive_seconds)
+        configure_shared(self.config)
+        self.writer, self.seen_index = open_storage(self.config, self.db)
+        self.export = open_export(self.config)
+        dedup_config = self.config.get("dedup", {})
+        if dedup_config.get("enabled", True):
+            self.dedup = DedupEngine(**{k: v for k, v in dedup_config.items() if k != "enabled"}, retain=True)
+        self.scheduler = SourceScheduler.from_config(self.config)
+        self._schedule_all(time.monotonic())
+        last_compact = time.monotonic()
+        self.logger.info(f"Daemon started with {len(self.queries)} query(s) x {len(self.bands)} band(s)")
+
+        try:
+            while not self._stopping.is_set():
+                due = self.queue.next_due()
+                if due is None:
+                    self.logger.warning("No bands left to refresh, stopping")
+                    break
+                wait = due - time.monotonic()
+                if wait > 0:
+                    await self._wait(wait)
+                    continue
+
+                tasks = self.queue.pop_due(time.monotonic(), self.max_queries_per_round)
+                round_task = asyncio.ensure_future(self.run_round(tasks))
+                stop_task = asyncio.ensure_future(self._stopping.wait())
+                await asyncio.wait({round_task, stop_task}, return_when=asyncio.FIRST_COMPLETED)
+                stop_task.cancel()
+                if not round_task.done():
+                    # Stopping: give the in-flight round a grace period, then cancel it;
+                    # the pipeline still flushes whatever reached its stages
+                    done, _ = await asyncio.wait({round_task}, timeout=self.drain_seconds)
+                    if not done:
+                        self.logger.warning(f"Round did not finish within {self.drain_seconds}s, cancelling")
+                        round_task.cancel()
+                        await asyncio.gather(round_task, return_exceptions=True)
+                        break
+
+                try:
+                    ok = round_task.result()
+                except Exception as e:
+                    self.logger.error(f"Refresh round failed: {e}")
+                    ok = [False] * len(tasks)
+                finished = time.monotonic()
+                for task, task_ok in zip(tasks, ok):
+                    self.queue.push(task.query, task.band, finished + (task.interval if task_ok else min(self.retry, task.interval)))
+
+                if self.seen_index is not None and finished - last_compact >= self.compact_interval:
+                    await asyncio.to_thread(self.seen_index.compact)
+                    last_compact = finished
+        finally:
+            stats = self.writer.stats
+            self.logger.info(f"Daemon stopped: {stats.written} events stored ({stats.skipped} unchanged, {stats.failed} failed)")
+            if self.export is not None:
+                await self.export.close()
+            if self.seen_index is not None:
+                self.seen_index.compact()
+                self.seen_index.close()
+            await close_transport()
+            close_parse_pool()
+            close_metrics()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Keep collected events fresh as a long-running service")
+    parser.add_argument("--config", default="config.yaml")
+    parser.add_argument("--jobs", help="YAML/JSON file of batch queries, overriding batch.file")
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    configure_logging(**config.get("logging", {}))
+    db = init_firestore(config)
+
+    try:
+        daemon = EventDaemon(config, db, load_queries(config, args.jobs), **config.get("daemon", {}))
+        await daemon.serve()
+    finally:
+        close_logging()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,369 @@
+import json
+import logging
+import os
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, time, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from event_keys import normalize_text
+from event_model import EventItem
+from geo_index import GeoIndex, distance_km, has_coordinates
+from pipeline import Stage
+
+# Words that say nothing about which event it is
+STOP_WORDS = {"the", "a", "an", "and", "of", "at", "in", "on", "for", "with", "live", "tour", "presents", "vs"}
+
+# List fields that are unioned when events are merged
+LIST_FIELDS = ("labels", "image_urls", "ticket_urls")
+
+# Fields that make up the stored document identity and are never merged in
+IDENTITY_FIELDS = ("source", "source_id", "title", "venue", "start_date")
+
+# Which source's version of a duplicated event becomes the stored one, best first
+DEFAULT_SOURCE_PRIORITY = ("ticketmaster", "predicthq", "serpapi")
+
+
+def title_tokens(title: Optional[str]) -> Set[str]:
+    return {token for token in normalize_text(title).split() if token not in STOP_WORDS}
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def merge_events(base: EventItem, other: EventItem) -> EventItem:
+    """
+    Fills the fields missing from ``base`` with those of ``other`` and unions
+    the list fields; identity fields always stay those of ``base``.
+    """
+    updates = {}
+    for name in EventItem.model_fields:
+        if name in IDENTITY_FIELDS:
+            continue
+        current = getattr(base, name)
+        incoming = getattr(other, name)
+        if incoming is None:
+            continue
+        if name in LIST_FIELDS and current:
+            merged = list(dict.fromkeys([*current, *incoming]))
+            if len(merged) != len(current):
+                updates[name] = merged
+        elif current is None:
+            updates[name] = incoming
+    return base.model_copy(update=updates) if updates else base
+
+
+def _span(event: EventItem) -> Tuple[datetime, datetime]:
+    start = event.start_date
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    if event.duration_seconds:
+        return start, start + timedelta(seconds=event.duration_seconds)
+    # Without a duration an event is taken to last until the end of its day
+    return start, datetime.combine(start.date() + timedelta(days=1), time(), start.tzinfo)
+
+
+def dates_overlap(a: EventItem, b: EventItem) -> bool:
+    if a.start_date is None or b.start_date is None:
+        return False
+    a_start, a_end = _span(a)
+    b_start, b_end = _span(b)
+    return a_start < b_end and b_start < a_end
+
+
+@dataclass
+class _Entry:
+    # Merged view of the cluster so far, used for matching
+    event: EventItem
+    tokens: Set[str]
+    venue: Set[str]
+    day: Optional[int]
+    # Latest version of every member, the first event seen included
+    members: Dict[Tuple, EventItem] = field(default_factory=dict)
+    id_keys: List[Tuple[str, str]] = field(default_factory=list)
+    pending: bool = True
+    # With ``retain``: the version last released, its canonical member and the members already logged
+    released: Optional[EventItem] = None
+    canonical: Optional[Tuple] = None
+    logged: Set[Tuple] = field(default_factory=set)
+
+
+class DedupEngine:
+    """
+    Fuzzy cross-source deduplication with blocking.
+
+    Events are bucketed by start day and looked up either through a
+    per-day GeoIndex (events within ``candidate_km``) or by title block,
+    and only those candidates are compared, so the cost
+    grows roughly linearly with the number of events. Events with
+    coordinates on both sides match only within ``max_distance_km``; without
+    them the venues, or else the city and the dates, have to agree as well
+    as the title.
+
+    Matches are merged into the first event seen so later events are
+    compared against everything known so far. ``pop_clusters`` releases the
+    finished days and builds the final version of each of their events: the
+    member from the highest-priority source (then lowest source ID) is
+    canonical, so the stored identity does not depend on arrival order, and
+    the others fill in its missing fields.
+
+    With ``retain`` (the daemon) released clusters stay indexed, so events
+    fetched in later runs still match them. A cluster is then released again
+    only when a new or changed member alters it, and keeps the canonical
+    member it was first released with, so its stored document keeps its ID.
+    ``expire`` drops the days that have passed.
+    """
+
+    def __init__(
+        self,
+        title_threshold: float = 0.6,
+        venue_threshold: float = 0.5,
+        cell_degrees: float = 0.01,
+        max_distance_km: float = 0.5,
+        candidate_km: float = 2.0,
+        source_priority: Sequence[str] = DEFAULT_SOURCE_PRIORITY,
+        retain: bool = False,
+    ):
+        self.title_threshold = title_threshold
+        self.venue_threshold = venue_threshold
+        self.cell_degrees = cell_degrees
+        self.max_distance_km = max_distance_km
+        self.candidate_km = max(candidate_km, max_distance_km)
+        self.retain = retain
+        self._source_rank = {source: rank for rank, source in enumerate(source_priority)}
+        self._next_index = 0
+        self._entries: Dict[int, _Entry] = {}
+        self._by_source_id: Dict[Tuple[str, str], int] = {}
+        # Per start day (None for undated events): its entries, geo index and title blocks
+        self._by_day: Dict[Optional[int], List[int]] = defaultdict(list)
+        self._geo_index: Dict[Optional[int], GeoIndex] = {}
+        self._title_index: Dict[Optional[int], Dict[str, List[int]]] = defaultdict(lambda: defaultdict(list))
+        # Entries added or changed since they were last released, by day
+        self._pending: Dict[Optional[int], List[int]] = defaultdict(list)
+
+    @staticmethod
+    def _day(event: EventItem) -> Optional[int]:
+        return event.start_date.date().toordinal() if event.start_date else None
+
+    @staticmethod
+    def _member_key(event: EventItem) -> Tuple:
+        # A member fetched again replaces its earlier version; sources without IDs are told apart by URL or title
+        if event.source_id:
+            return event.source or "", event.source_id
+        return event.source or "", event.url or normalize_text(event.title)
+
+    @staticmethod
+    def _title_blocks(tokens: Set[str]) -> List[str]:
+        # Events sharing one of their two rarest-looking (longest) tokens land in the same block
+        return sorted(tokens, key=lambda token: (-len(token), token))[:2] or [""]
+
+    def _candidates(self, event: EventItem, tokens: Set[str]) -> Set[int]:
+        day = self._day(event)
+        candidates = set()
+        blocks = self._title_index.get(day)
+        if blocks:
+            for block in self._title_blocks(tokens):
+                candidates.update(blocks.get(block, ()))
+        if has_coordinates(event) and day in self._geo_index:
+            nearby = self._geo_index[day].within(event.latitude, event.longitude, self.candidate_km)
+            candidates.update(index for _, index in nearby)
+        return candidates
+
+    def _matches(self, entry: _Entry, event: EventItem, tokens: Set[str], venue: Set[str]) -> bool:
+        canonical = entry.event
+        # Two different IDs from the same source are two different events
+        if canonical.source == event.source and canonical.source_id and event.source_id:
+            return False
+        if jaccard(entry.tokens, tokens) < self.title_threshold:
+            return False
+        if has_coordinates(canonical) and has_coordinates(event):
+            # Same title far apart is a different show (O2 Academy Brixton vs Birmingham)
+            return distance_km(canonical.latitude, canonical.longitude, event.latitude, event.longitude) <= self.max_distance_km
+        city, other_city = normalize_text(canonical.city), normalize_text(event.city)
+        if entry.venue and venue:
+            if city and other_city and city != other_city:
+                return False
+            return jaccard(entry.venue, venue) >= self.venue_threshold
+        # Nothing but the title to go on: "Hamilton" in London is not "Hamilton" in New York
+        return bool(city) and city == other_city and dates_overlap(canonical, event)
+
+    def _merge(self, index: int, event: EventItem) -> None:
+        entry = self._entries[index]
+        entry.members[self._member_key(event)] = event
+        entry.event = merge_events(entry.event, event)
+        if not entry.pending:
+            entry.pending = True
+            self._pending[entry.day].append(index)
+
+    def _priority(self, event: EventItem) -> Tuple:
+        return (
+            self._source_rank.get(event.source, len(self._source_rank)),
+            event.source or "",
+            event.source_id is None,
+            event.source_id or "",
+            normalize_text(event.title),
+            event.url or "",
+        )
+
+    def add(self, event: EventItem) -> None:
+        """
+        Adds an event to the index, merging it into a matching cluster or
+        starting a new one.
+        """
+        id_key = (event.source or "", event.source_id) if event.source_id else None
+        if id_key and id_key in self._by_source_id:
+            self._merge(self._by_source_id[id_key], event)
+            return
+
+        tokens = title_tokens(event.title)
+        venue = title_tokens(event.venue)
+        for index in sorted(self._candidates(event, tokens)):
+            entry = self._entries[index]
+            if self._matches(entry, event, tokens, venue):
+                self._merge(index, event)
+                if id_key:
+                    self._by_source_id[id_key] = index
+                    entry.id_keys.append(id_key)
+                return
+
+        index = self._next_index
+        self._next_index += 1
+        day = self._day(event)
+        entry = _Entry(event=event, tokens=tokens, venue=venue, day=day, members={self._member_key(event): event})
+        self._entries[index] = entry
+        if id_key:
+            self._by_source_id[id_key] = index
+            entry.id_keys.append(id_key)
+        self._by_day[day].append(index)
+        self._pending[day].append(index)
+        for block in self._title_blocks(tokens):
+            self._title_index[day][block].append(index)
+        if has_coordinates(event):
+            if day not in self._geo_index:
+                self._geo_index[day] = GeoIndex(self.cell_degrees)
+            self._geo_index[day].add(event.latitude, event.longitude, index)
+
+    def _drop_day(self, day: Optional[int]) -> None:
+        for index in self._by_day.pop(day, ()):
+            for id_key in self._entries.pop(index).id_keys:
+                self._by_source_id.pop(id_key, None)
+        self._geo_index.pop(day, None)
+        self._title_index.pop(day, None)
+        self._pending.pop(day, None)
+
+    def pop_clusters(self, before: Optional[datetime] = None) -> Iterator[Tuple[EventItem, List[EventItem]]]:
+        """
+        Releases the pending clusters of finished days and builds their final
+        events. Without ``retain`` the released days are dropped.
+
+        :param before: Only days before this date's day are finished; None
+            releases everything, undated events included.
+        :return: For each released cluster, in day and then arrival order, its
+            final merged version and the members merged into it that were
+            not reported before.
+        """
+        if before is None:
+            days = sorted(self._pending, key=lambda day: (day is None, day or 0))
+        else:
+            limit = before.date().toordinal()
+            days = sorted(day for day in self._pending if day is not None and day < limit)
+        for day in days:
+            indexes = self._pending.pop(day)
+            for index in indexes:
+                entry = self._entries[index]
+                entry.pending = False
+                members = sorted(
+                    entry.members.items(),
+                    key=lambda item: (item[0] != entry.canonical, self._priority(item[1])),
+                )
+                merged = members[0][1]
+                for _, member in members[1:]:
+                    merged = merge_events(merged, member)
+                if self.retain:
+                    if merged == entry.released:
+                        continue
+                    entry.released, entry.canonical = merged, members[0][0]
+                duplicates = [member for key, member in members[1:] if key not in entry.logged]
+                entry.logged.update(key for key, _ in members[1:])
+                yield merged, duplicates
+            if not self.retain:
+                self._drop_day(day)
+
+    def expire(self, before: datetime) -> None:
+        """
+        Forgets the clusters of days before this date's day, pending or not.
+        """
+        limit = before.date().toordinal()
+        for day in [day for day in self._by_day if day is not None and day < limit]:
+            self._drop_day(day)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DedupStage(Stage):
+    """
+    Pipeline stage around DedupEngine.
+
+    Events are held back only until their start day is finished, that is
+    until the pipeline's watermark says no job will yield another event for
+    that day: a late duplicate may still change both the merged fields and
+    which member is canonical. ``advance`` then passes on exactly one final
+    event per cluster of the finished days, so storage and exports never see
+    an intermediate version, and memory holds only the days still in
+    progress. Merged members are appended to ``logs/duplicates.log`` as
+    their clusters are released; ``close`` releases whatever is left.
+    """
+
+    name = "dedup"
+
+    def __init__(self, engine: Optional[DedupEngine] = None, log_path: str = "logs/duplicates.log"):
+        self.engine = engine if engine is not None else DedupEngine()
+        self.log_path = log_path
+        self.released = 0
+        self.duplicates = 0
+        self.logger = logging.getLogger("DedupStage")
+        self._log_file = None
+
+    def _log_duplicates(self, canonical: EventItem, duplicates: List[EventItem]) -> None:
+        if self._log_file is None:
+            if os.path.dirname(self.log_path):
+                os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+            self._log_file = open(self.log_path, "a", encoding="utf-8")
+        reference = {"source": canonical.source, "source_id": canonical.source_id, "title": canonical.title}
+        for duplicate in duplicates:
+            record = {"duplicate": duplicate.model_dump(mode="json"), "canonical": reference}
+            self._log_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def _release(self, before: Optional[datetime]) -> List[EventItem]:
+        events = []
+        for canonical, duplicates in self.engine.pop_clusters(before):
+            events.append(canonical)
+            if duplicates:
+                self.duplicates += len(duplicates)
+                self._log_duplicates(canonical, duplicates)
+        self.released += len(events)
+        if self._log_file is not None:
+            self._log_file.flush()
+        return events
+
+    async def process(self, batch: List[EventItem]) -> List[EventItem]:
+        for event in batch:
+            self.engine.add(event)
+        return []
+
+    async def advance(self, watermark: datetime) -> List[EventItem]:
+        return self._release(watermark)
+
+    async def close(self) -> List[EventItem]:
+        try:
+            events = self._release(None)
+        finally:
+            if self._log_file is not None:
+                self._log_file.close()
+                self._log_file = None
+        self.logger.info(f"Released {self.released} events, {self.duplicates} duplicates merged")
+        return events
@@ -0,0 +1,49 @@
+import hashlib
+import json
+import re
+import unicodedata
+from typing import Optional
+
+from event_model import EventItem
+
+_NON_WORD = re.compile(r"[^\w\s]")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_text(value: Optional[str]) -> str:
+    """
+    Lowercases, strips accents and punctuation and collapses whitespace,
+    so that "The O2 Arena," and "the o2  arena" compare equal.
+    """
+    if not value:
+        return ""
+    value = unicodedata.normalize("NFKD", value)
+    value = "".join(ch for ch in value if not unicodedata.combining(ch))
+    value = _NON_WORD.sub(" ", value.lower())
+    return _SPACES.sub(" ", value).strip()
+
+
+def canonical_key(event: EventItem) -> str:
+    """
+    Stable identity of an event: the source and its own ID when there is one,
+    otherwise the normalized title, venue and start date.
+    """
+    if event.source_id:
+        return f"{event.source or ''}:{event.source_id}"
+    start = event.start_date.date().isoformat() if event.start_date else ""
+    return f"{event.source or ''}|{normalize_text(event.title)}|{normalize_text(event.venue)}|{start}"
+
+
+def document_id(event: EventItem) -> str:
+    """
+    Deterministic Firestore document ID derived from canonical_key.
+    """
+    return hashlib.sha1(canonical_key(event).encode("utf-8")).hexdigest()
+
+
+def content_hash(event: EventItem) -> str:
+    """
+    Hash of every field of the event, used to detect unchanged documents.
+    """
+    payload = json.dumps(event.model_dump(mode="json"), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
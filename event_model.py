@@ -1,12 +1,17 @@
-from pydantic import BaseModel, HttpUrl, Field
-from typing import Optional, List
+from pydantic import BaseModel, HttpUrl, Field, PlainSerializer, TypeAdapter
+from typing import Annotated, Any, Dict, Iterable, Optional, List
 from datetime import datetime
 
+# Serialized with str() so events built without validation (see build_events),
+# which still hold plain strings, dump the same way as validated ones
+HttpUrlStr = Annotated[HttpUrl, PlainSerializer(str, return_type=str)]
+
 
 class EventItem(BaseModel):
+    source: Optional[str] = Field(None, description="Source agent (ticketmaster, serpapi, predicthq)")
     source_id: Optional[str] = Field(None, description="Internal source event ID")
     title: Optional[str] = Field(None, description="Event title")
-    url: Optional[HttpUrl] = Field(None, description="Event source URL")
+    url: Optional[HttpUrlStr] = Field(None, description="Event source URL")
 
     start_date: Optional[datetime] = Field(None, description="Start date and time")
     sales_start: Optional[datetime] = Field(None, description="Sales start")
@@ -32,11 +37,33 @@ class EventItem(BaseModel):
     predicted_spend: Optional[float] = Field(None, description="Predicted spend at event")
 
     description: Optional[str] = Field(None, description="Event description")
-    image_urls: Optional[List[HttpUrl]] = Field(None, description="List of image URLs")
-    ticket_urls: Optional[List[HttpUrl]] = Field(None, description="List of ticket purchase links")
+    image_urls: Optional[List[HttpUrlStr]] = Field(None, description="List of image URLs")
+    ticket_urls: Optional[List[HttpUrlStr]] = Field(None, description="List of ticket purchase links")
 
     price: Optional[float] = Field(None, description="Ticket price, if known")
 
+
+# Validates a JSON array of events straight from bytes (see export.read_ndjson)
+EVENT_LIST_ADAPTER = TypeAdapter(List[EventItem])
+
+
+def build_events(rows: Iterable[Dict[str, Any]], trusted: bool = False) -> List[EventItem]:
+    """
+    Builds EventItems from parser output.
+
+    By default every row is validated. With ``trusted`` the rows are
+    assumed to already carry the right types (as our own parsers produce)
+    and are constructed without validation: URL fields are neither checked
+    nor normalized, and are stored as the parser produced them.
+
+    :param rows: Dicts of EventItem fields.
+    :param trusted: Skip validation for rows from a trusted parser.
+    :return: List of EventItem.
+    """
+    if trusted:
+        return [EventItem.model_construct(**row) for row in rows]
+    return [EventItem.model_validate(row) for row in rows]
+
 # class EventItem(BaseModel):
 #     title: Optional[str] = Field(None, description="Event title")
 #     url: Optional[HttpUrl] = Field(None, description="Event source URL")
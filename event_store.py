@@ -0,0 +1,282 @@
+import sys
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from event_model import EventItem, build_events
+
+# Low-cardinality strings, dictionary-encoded as int32 codes (-1 = missing)
+CATEGORICAL_FIELDS = ("source", "city", "country", "venue", "timezone", "segment", "genre", "subgenre", "category", "promoter", "labels")
+
+# Numbers, stored as float64 with NaN for missing
+NUMERIC_FIELDS = ("latitude", "longitude", "duration_seconds", "attendance", "predicted_spend", "price")
+
+# Datetimes, stored as naive UTC datetime64 with NaT for missing
+DATETIME_FIELDS = ("start_date", "sales_start", "sales_end")
+
+# List fields, joined into a single string per row
+LIST_FIELDS = ("labels", "image_urls", "ticket_urls")
+LIST_SEPARATOR = "\x1f"
+# An empty list would join to "", which splits back to [""]
+EMPTY_LIST = "\x1e"
+
+INTEGER_FIELDS = ("duration_seconds", "attendance")
+
+Range = Tuple[Any, Any]
+
+
+def _utc_naive(value: Optional[datetime]) -> Optional[datetime]:
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _join(value: Optional[List[Any]]) -> Optional[str]:
+    if value is None:
+        return None
+    return LIST_SEPARATOR.join(map(str, value)) if value else EMPTY_LIST
+
+
+def _split(value: Optional[str]) -> Optional[List[str]]:
+    if value is None:
+        return None
+    return value.split(LIST_SEPARATOR) if value != EMPTY_LIST else []
+
+
+class EventStore:
+    """
+    Columnar in-memory copy of a set of events, for fast local queries.
+
+    Every field becomes one NumPy column: repeated strings (city, venue,
+    genre, category, ...) are dictionary-encoded, numbers and datetimes are
+    packed into typed arrays. Filters, sorting and group-bys run vectorized
+    over the columns and work on row indices; only the rows that end up in a
+    result are turned back into EventItem objects.
+
+    Requires numpy.
+    """
+
+    def __init__(self, events: Sequence[EventItem]):
+        if np is None:
+            raise ImportError("EventStore requires numpy (pip install numpy)")
+        self.size = len(events)
+        self.codes: Dict[str, "np.ndarray"] = {}
+        self.dictionaries: Dict[str, List[Any]] = {}
+        self.columns: Dict[str, "np.ndarray"] = {}
+        self.aware: Dict[str, "np.ndarray"] = {}
+
+        for name in EventItem.model_fields:
+            values = [getattr(event, name) for event in events]
+            if name in LIST_FIELDS:
+                values = [_join(value) for value in values]
+            if name in CATEGORICAL_FIELDS:
+                self._encode(name, values)
+            elif name in NUMERIC_FIELDS:
+                self.columns[name] = np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+            elif name in DATETIME_FIELDS:
+                self.aware[name] = np.fromiter((value is not None and value.tzinfo is not None for value in values), dtype=bool, count=self.size)
+                self.columns[name] = np.array([_utc_naive(value) for value in values], dtype="datetime64[us]")
+            else:
+                # High-cardinality strings (titles, IDs, URLs) stay as object arrays
+                column = np.empty(self.size, dtype=object)
+                column[:] = [value if value is None or isinstance(value, str) else str(value) for value in values]
+                self.columns[name] = column
+
+    @classmethod
+    def from_events(cls, events: Iterable[EventItem]) -> "EventStore":
+        return cls(list(events))
+
+    def _encode(self, name: str, values: List[Optional[str]]) -> None:
+        lookup: Dict[str, int] = {}
+        self.codes[name] = np.fromiter(
+            (-1 if value is None else lookup.setdefault(value, len(lookup)) for value in values),
+            dtype=np.int32,
+            count=self.size,
+        )
+        self.dictionaries[name] = list(lookup)
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Approximate memory held by the store, including the strings behind
+        object columns and dictionaries.
+        """
+        total = sum(column.nbytes for column in self.codes.values())
+        total += sum(column.nbytes for column in self.aware.values())
+        for column in self.columns.values():
+            total += column.nbytes
+            if column.dtype == object:
+                total += sum(sys.getsizeof(value) for value in column if value is not None)
+        for values in self.dictionaries.values():
+            total += sum(sys.getsizeof(value) for value in values)
+        return total
+
+    def _bound(self, name: str, value: Any) -> Any:
+        if name in DATETIME_FIELDS:
+            return np.datetime64(_utc_naive(value), "us")
+        return value
+
+    def mask(self, **conditions: Union[Any, Range, Sequence[Any]]) -> "np.ndarray":
+        """
+        Builds a boolean row mask; all conditions must hold.
+
+        Categorical and text fields take a value or a list of accepted values.
+        Numeric and datetime fields take a (low, high) range, either end may
+        be None; rows with a missing value never match a range.
+
+        :return: Boolean array with one entry per row.
+        """
+        result = np.ones(self.size, dtype=bool)
+        for name, condition in conditions.items():
+            if name in self.codes:
+                accepted = list(condition) if isinstance(condition, (list, tuple, set)) else [condition]
+                lookup = {value: code for code, value in enumerate(self.dictionaries[name])}
+                wanted = [-1 if value is None else lookup.get(value, -2) for value in accepted]
+                codes = self.codes[name]
+                matched = np.zeros(self.size, dtype=bool)
+                for code in wanted:
+                    matched |= codes == code
+                result &= matched
+            elif name in NUMERIC_FIELDS or name in DATETIME_FIELDS:
+                low, high = condition
+                column = self.columns[name]
+                if low is not None:
+                    result &= column >= self._bound(name, low)
+                if high is not None:
+                    result &= column <= self._bound(name, high)
+            elif name in self.columns:
+                accepted = condition if isinstance(condition, (list, tuple, set)) else [condition]
+                result &= np.isin(self.columns[name], list(accepted))
+            else:
+                raise KeyError(f"Unknown event field: {name}")
+        return result
+
+    def _sort_key(self, name: str, rows: "np.ndarray", descending: bool) -> Tuple["np.ndarray", "np.ndarray"]:
+        if name in self.codes:
+            codes = self.codes[name][rows]
+            ranks = np.argsort(np.argsort(np.array(self.dictionaries[name], dtype=object), kind="stable"), kind="stable")
+            missing = codes < 0
+            key = np.where(missing, 0, ranks[np.maximum(codes, 0)] if len(ranks) else 0)
+        elif name in DATETIME_FIELDS:
+            column = self.columns[name][rows]
+            missing = np.isnat(column)
+            key = np.where(missing, 0, column.view(np.int64))
+        elif name in NUMERIC_FIELDS:
+            column = self.columns[name][rows]
+            missing = np.isnan(column)
+            key = np.where(missing, 0.0, column)
+        else:
+            raise KeyError(f"Cannot sort by field: {name}")
+        return (-key if descending else key), missing
+
+    def select(
+        self,
+        mask: Optional["np.ndarray"] = None,
+        order_by: Optional[str] = None,
+        descending: bool = False,
+        limit: Optional[int] = None,
+    ) -> "np.ndarray":
+        """
+        Picks rows, optionally sorted and truncated.
+
+        :param mask: Row mask from ``mask()``; all rows when None.
+        :param order_by: Field to sort by; missing values always sort last.
+        :param descending: Sort largest first.
+        :param limit: Maximum number of rows to return.
+        :return: Row indices.
+        """
+        rows = np.arange(self.size) if mask is None else np.flatnonzero(mask)
+        if order_by is not None:
+            key, missing = self._sort_key(order_by, rows, descending)
+            rows = rows[np.lexsort((key, missing))]
+        if limit is not None:
+            rows = rows[:limit]
+        return rows
+
+    def group_by(
+        self,
+        by: str,
+        value: Optional[str] = None,
+        how: str = "count",
+        mask: Optional["np.ndarray"] = None,
+    ) -> Dict[Optional[str], float]:
+        """
+        Aggregates a numeric field per value of a categorical field.
+
+        :param by: Categorical field to group on.
+        :param value: Numeric field to aggregate; not needed for "count".
+        :param how: One of "count", "sum", "mean", "min", "max". Missing
+            values are ignored.
+        :param mask: Optional row mask to aggregate over.
+        :return: Aggregate per group value (None for rows missing ``by``),
+            only for groups that have at least one row.
+        """
+        if by not in self.codes:
+            raise KeyError(f"Cannot group by field: {by}")
+        groups = self.codes[by] + 1
+        if mask is not None:
+            groups = groups[mask]
+        names = [None] + self.dictionaries[by]
+        counts = np.bincount(groups, minlength=len(names))
+        if how == "count":
+            return {names[i]: int(counts[i]) for i in np.flatnonzero(counts)}
+
+        column = self.columns[value] if mask is None else self.columns[value][mask]
+        present = ~np.isnan(column)
+        groups, column = groups[present], column[present]
+        present_counts = np.bincount(groups, minlength=len(names))
+        if how in ("sum", "mean"):
+            totals = np.bincount(groups, weights=column, minlength=len(names))
+            if how == "mean":
+                totals = totals / np.maximum(present_counts, 1)
+        elif how in ("min", "max"):
+            ufunc = np.minimum if how == "min" else np.maximum
+            totals = np.full(len(names), np.inf if how == "min" else -np.inf)
+            ufunc.at(totals, groups, column)
+        else:
+            raise ValueError(f"Unknown aggregation: {how}")
+        return {names[i]: float(totals[i]) for i in np.flatnonzero(present_counts)}
+
+    def column(self, name: str, rows: Optional["np.ndarray"] = None) -> List[Any]:
+        """
+        Decodes one field back to Python values.
+        """
+        if name in self.codes:
+            dictionary = self.dictionaries[name]
+            codes = self.codes[name] if rows is None else self.codes[name][rows]
+            values = [dictionary[code] if code >= 0 else None for code in codes.tolist()]
+        else:
+            column = self.columns[name] if rows is None else self.columns[name][rows]
+            if name in NUMERIC_FIELDS:
+                values = [None if value != value else value for value in column.tolist()]
+                if name in INTEGER_FIELDS:
+                    values = [None if value is None else int(value) for value in values]
+            elif name in DATETIME_FIELDS:
+                aware = self.aware[name] if rows is None else self.aware[name][rows]
+                values = [
+                    value.replace(tzinfo=timezone.utc) if value is not None and is_aware else value
+                    for value, is_aware in zip(column.tolist(), aware.tolist())
+                ]
+            else:
+                values = column.tolist()
+        if name in LIST_FIELDS:
+            values = [_split(value) for value in values]
+        return values
+
+    def to_events(self, rows: Optional["np.ndarray"] = None) -> List[EventItem]:
+        """
+        Rebuilds EventItem objects for the given rows.
+
+        :param rows: Row indices from ``select()``; all rows when None.
+        :return: Events in row order.
+        """
+        names = list(EventItem.model_fields)
+        columns = [self.column(name, rows) for name in names]
+        return build_events([dict(zip(names, values)) for values in zip(*columns)], trusted=True)
@@ -0,0 +1,310 @@
+import asyncio
+import glob
+import gzip
+import logging
+import os
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, BinaryIO, Iterator, List, Optional
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+from event_model import EVENT_LIST_ADAPTER, EventItem, build_events
+from event_store import CATEGORICAL_FIELDS, DATETIME_FIELDS, INTEGER_FIELDS, LIST_FIELDS, NUMERIC_FIELDS
+from parse_pool import loads
+from pipeline import Stage
+
+SUFFIXES = {None: "", "gzip": ".gz", "zstd": ".zst"}
+
+# Strings dictionary-encoded in columnar exports (labels stay a list there)
+DICTIONARY_FIELDS = tuple(name for name in CATEGORICAL_FIELDS if name not in LIST_FIELDS)
+
+
+def _open_reader(path: str) -> BinaryIO:
+    compression = _compression_for(path)
+    if compression == "gzip":
+        return gzip.open(path, "rb")
+    if compression == "zstd":
+        if zstandard is None:
+            raise ImportError("zstd compression requires the zstandard package")
+        return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+    return open(path, "rb")
+
+
+def _compression_for(path: str) -> Optional[str]:
+    for compression, suffix in SUFFIXES.items():
+        if suffix and path.endswith(suffix):
+            return compression
+    return None
+
+
+def read_ndjson(path: str, chunk_size: int = 10000, trusted: bool = False) -> Iterator[List[EventItem]]:
+    """
+    Reads an NDJSON export back in batches; compression is detected from
+    the file name.
+
+    :param path: Export file.
+    :param chunk_size: Events per yielded batch.
+    :param trusted: Skip validation (see build_events); exports were
+        validated when they were written.
+    """
+    def decode(lines: List[bytes]) -> List[EventItem]:
+        if trusted:
+            rows = [loads(line) for line in lines]
+            for row in rows:
+                for name in DATETIME_FIELDS:
+                    if row.get(name):
+                        row[name] = datetime.fromisoformat(row[name])
+            return build_events(rows, trusted=True)
+        return EVENT_LIST_ADAPTER.validate_json(b"[" + b",".join(lines) + b"]")
+
+    with _open_reader(path) as file:
+        lines: List[bytes] = []
+        for line in _lines(file):
+            if line.strip():
+                lines.append(line)
+            if len(lines) >= chunk_size:
+                yield decode(lines)
+                lines = []
+        if lines:
+            yield decode(lines)
+
+
+def _lines(file: Any, block_size: int = 1 << 20) -> Iterator[bytes]:
+    # Block-wise split; zstandard readers are not line-iterable
+    pending = b""
+    while True:
+        block = file.read(block_size)
+        if not block:
+            break
+        *complete, pending = (pending + block).split(b"\n")
+        yield from complete
+    if pending:
+        yield pending
+
+
+class _RotatingExport(Stage, ABC):
+    """
+    Shared file handling for export stages: files are named
+    ``{prefix}-{YYYYMMDD}-{part}{extension}`` and a new file is started
+    when the UTC day changes or the current file reaches its size limit.
+    Existing files are never overwritten.
+    """
+
+    name = "export"
+    extension = ""
+
+    def __init__(self, directory: str = "exports", prefix: str = "events", max_bytes: int = 256 * 1024 * 1024, rotate_daily: bool = True):
+        self.directory = directory
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.rotate_daily = rotate_daily
+        self.paths: List[str] = []
+        self.exported = 0
+        self.logger = logging.getLogger(type(self).__name__)
+        self._day: Optional[str] = None
+
+    def _next_path(self, day: str) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        pattern = os.path.join(self.directory, f"{self.prefix}-{day}-*{self.extension}")
+        part = len(glob.glob(pattern))
+        while True:
+            path = os.path.join(self.directory, f"{self.prefix}-{day}-{part:04d}{self.extension}")
+            if not os.path.exists(path):
+                return path
+            part += 1
+
+    def _needs_rotation(self) -> bool:
+        day = datetime.utcnow().strftime("%Y%m%d")
+        if not self.paths or (self.rotate_daily and day != self._day) or self._size() >= self.max_bytes:
+            self._day = day
+            return True
+        return False
+
+    @abstractmethod
+    def _size(self) -> int:
+        """
+        Bytes written to the current file so far; 0 when none is open.
+        """
+        pass
+
+    @abstractmethod
+    def _write(self, batch: List[EventItem]) -> None:
+        """
+        Adds a batch to the export, rotating files via _needs_rotation.
+        """
+        pass
+
+    @abstractmethod
+    def _flush(self) -> None:
+        """
+        Pushes buffered events to the current file, keeping it open.
+        """
+        pass
+
+    @abstractmethod
+    def _finish(self) -> None:
+        """
+        Flushes and closes the current file.
+        """
+        pass
+
+    async def process(self, batch: List[EventItem]) -> List[EventItem]:
+        await asyncio.to_thread(self._write, batch)
+        self.exported += len(batch)
+        return batch
+
+    async def flush(self) -> None:
+        """
+        Pushes buffered events to the current file without closing it, so a
+        long-lived stage (the daemon's) keeps one file across pipeline runs.
+        """
+        await asyncio.to_thread(self._flush)
+
+    async def close(self) -> None:
+        await asyncio.to_thread(self._finish)
+        self.logger.info(f"Exported {self.exported} events to {len(self.paths)} file(s) in {self.directory}")
+
+
+class NdjsonExportStage(_RotatingExport):
+    """
+    Streams events to newline-delimited JSON files, one event per line,
+    optionally gzip- or zstd-compressed. Events are written as batches
+    arrive, so the export never has to fit in memory.
+    """
+
+    def __init__(self, compression: Optional[str] = "gzip", level: Optional[int] = None, **options):
+        if compression not in SUFFIXES:
+            raise ValueError(f"Unknown compression: {compression}")
+        if compression == "zstd" and zstandard is None:
+            raise ImportError("zstd compression requires the zstandard package")
+        self.extension = ".ndjson" + SUFFIXES[compression]
+        super().__init__(**options)
+        self.compression = compression
+        self.level = level
+        self._raw: Optional[BinaryIO] = None
+        self._file: Optional[BinaryIO] = None
+
+    def _size(self) -> int:
+        # Compressed bytes flushed so far; compressors buffer, so this lags slightly
+        return self._raw.tell() if self._raw is not None else 0
+
+    def _open(self) -> None:
+        self._finish()
+        path = self._next_path(self._day)
+        self._raw = open(path, "wb")
+        if self.compression == "gzip":
+            self._file = gzip.GzipFile(fileobj=self._raw, mode="wb", compresslevel=self.level or 6)
+        elif self.compression == "zstd":
+            self._file = zstandard.ZstdCompressor(level=self.level or 3).stream_writer(self._raw, closefd=False)
+        else:
+            self._file = self._raw
+        self.paths.append(path)
+
+    def _write(self, batch: List[EventItem]) -> None:
+        if self._needs_rotation():
+            self._open()
+        self._file.write(b"".join(event.model_dump_json().encode() + b"\n" for event in batch))
+
+    def _flush(self) -> None:
+        # gzip and zstd flush a complete block, so everything written so far can be read back
+        if self._file is not None:
+            self._file.flush()
+            self._raw.flush()
+
+    def _finish(self) -> None:
+        if self._file is not None and self._file is not self._raw:
+            self._file.close()
+        if self._raw is not None:
+            self._raw.close()
+        self._file = self._raw = None
+
+
+def _arrow_schema() -> "pa.Schema":
+    fields = []
+    for name in EventItem.model_fields:
+        if name in LIST_FIELDS:
+            arrow_type = pa.list_(pa.string())
+        elif name in DICTIONARY_FIELDS:
+            arrow_type = pa.dictionary(pa.int32(), pa.string())
+        elif name in DATETIME_FIELDS:
+            arrow_type = pa.timestamp("us", tz="UTC")
+        elif name in INTEGER_FIELDS:
+            arrow_type = pa.int64()
+        elif name in NUMERIC_FIELDS:
+            arrow_type = pa.float64()
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(name, arrow_type))
+    return pa.schema(fields)
+
+
+class ParquetExportStage(_RotatingExport):
+    """
+    Writes events to Parquet files for analytics, one row group per
+    ``chunk_rows`` events, with repeated strings dictionary-encoded and
+    zstd compression. Files rotate on the same rules as the NDJSON export.
+
+    Requires pyarrow.
+    """
+
+    extension = ".parquet"
+
+    def __init__(self, chunk_rows: int = 50000, compression: str = "zstd", **options):
+        if pa is None:
+            raise ImportError("Parquet export requires pyarrow")
+        super().__init__(**options)
+        self.chunk_rows = chunk_rows
+        self.compression = compression
+        self.schema = _arrow_schema()
+        self._writer: Optional["pq.ParquetWriter"] = None
+        self._rows: List[dict] = []
+
+    def _size(self) -> int:
+        return os.path.getsize(self.paths[-1]) if self._writer is not None else 0
+
+    def _flush(self) -> None:
+        if not self._rows:
+            return
+        if self._needs_rotation():
+            self._close_writer()
+            path = self._next_path(self._day)
+            self._writer = pq.ParquetWriter(path, self.schema, compression=self.compression)
+            self.paths.append(path)
+        self._writer.write_table(pa.Table.from_pylist(self._rows, schema=self.schema), row_group_size=self.chunk_rows)
+        self._rows = []
+
+    def _write(self, batch: List[EventItem]) -> None:
+        self._rows.extend(event.model_dump(mode="python") for event in batch)
+        if len(self._rows) >= self.chunk_rows:
+            self._flush()
+
+    def _close_writer(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def _finish(self) -> None:
+        self._flush()
+        self._close_writer()
+
+
+EXPORT_FORMATS = {"ndjson": NdjsonExportStage, "parquet": ParquetExportStage}
+
+
+def create_export_stage(format: str = "ndjson", **options) -> Stage:
+    """
+    Builds the export stage from the ``export`` section of config.yaml.
+    """
+    if format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {format}")
+    return EXPORT_FORMATS[format](**options)
@@ -0,0 +1,221 @@
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from event_keys import content_hash, document_id
+from event_model import EventItem
+from pipeline import Stage
+
+# Firestore rejects batches with more than 500 operations
+MAX_BATCH_SIZE = 500
+
+
+@dataclass
+class WriteStats:
+    written: int = 0
+    skipped: int = 0
+    failed: int = 0
+    batches: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def throughput(self) -> float:
+        return self.written / self.elapsed if self.elapsed else 0.0
+
+
+class FirestoreWriter(Stage):
+    """
+    Storage stage that writes events to Firestore in batches instead of
+    one round trip per document.
+
+    By default writes are grouped into WriteBatch commits of up to 500
+    operations. With ``use_bulk_writer`` the client's BulkWriter is used
+    instead, which throttles itself and retries failed writes.
+
+    Document IDs are derived from each event's canonical key and every
+    document stores a ``content_hash``, so re-running over the same events
+    upserts in place and unchanged events are skipped before any write.
+    Stored events are recorded in the optional ``seen_index``.
+
+    As a pipeline stage it buffers incoming batches and stores them as soon
+    as a full Firestore batch is available; ``stats`` accumulates totals.
+    """
+
+    name = "store"
+
+    def __init__(
+        self,
+        db: Any,
+        collection: str = "events",
+        batch_size: int = MAX_BATCH_SIZE,
+        use_bulk_writer: bool = False,
+        max_retries: int = 3,
+        skip_unchanged: bool = True,
+        seen_index: Optional[Any] = None,
+    ):
+        self.db = db
+        self.collection = collection
+        self.batch_size = min(batch_size, MAX_BATCH_SIZE)
+        self.use_bulk_writer = use_bulk_writer
+        self.max_retries = max_retries
+        self.skip_unchanged = skip_unchanged
+        self.seen_index = seen_index
+        self.logger = logging.getLogger("FirestoreWriter")
+        self.stats = WriteStats()
+        self._buffer: List[EventItem] = []
+
+    def _documents(self, events: Iterable[EventItem]) -> List[Tuple[Any, dict]]:
+        collection = self.db.collection(self.collection)
+        documents: Dict[str, Tuple[Any, dict]] = {}
+        for event in events:
+            doc_id = document_id(event)
+            payload = event.model_dump(mode="json")
+            payload["content_hash"] = content_hash(event)
+            # The same event seen twice in one run collapses to its last version
+            documents[doc_id] = (collection.document(doc_id), payload)
+        return list(documents.values())
+
+    def _changed(self, documents: List[Tuple[Any, dict]]) -> List[Tuple[Any, dict]]:
+        """
+        Drops documents whose stored content_hash matches the new one.
+        Only the hash field is read back, in chunks of batch_size.
+        """
+        changed = []
+        for offset in range(0, len(documents), self.batch_size):
+            chunk = documents[offset:offset + self.batch_size]
+            stored = {
+                snapshot.id: snapshot.get("content_hash")
+                for snapshot in self.db.get_all([ref for ref, _ in chunk], field_paths=["content_hash"])
+                if snapshot.exists
+            }
+            changed.extend(
+                (ref, payload) for ref, payload in chunk
+                if stored.get(ref.id) != payload["content_hash"]
+            )
+        return changed
+
+    def _commit_batch(self, documents: List[Tuple[Any, dict]]) -> None:
+        batch = self.db.batch()
+        for ref, payload in documents:
+            batch.set(ref, payload)
+        batch.commit()
+
+    def _write_batches(self, documents: List[Tuple[Any, dict]], failed_ids: Set[str]) -> WriteStats:
+        stats = WriteStats()
+        started = time.perf_counter()
+        for offset in range(0, len(documents), self.batch_size):
+            chunk = documents[offset:offset + self.batch_size]
+            batch_started = time.perf_counter()
+            try:
+                self._commit_batch(chunk)
+                stats.written += len(chunk)
+                elapsed = time.perf_counter() - batch_started
+                self.logger.info(
+                    f"Committed batch {stats.batches + 1}: {len(chunk)} docs in {elapsed:.2f}s "
+                    f"({len(chunk) / elapsed if elapsed else 0:.0f} docs/s)"
+                )
+            except Exception as e:
+                stats.failed += len(chunk)
+                failed_ids.update(ref.id for ref, _ in chunk)
+                self.logger.error(f"Batch {stats.batches + 1} of {len(chunk)} docs failed: {e}")
+            stats.batches += 1
+        stats.elapsed = time.perf_counter() - started
+        return stats
+
+    def _write_bulk(self, documents: List[Tuple[Any, dict]], failed_ids: Set[str]) -> WriteStats:
+        stats = WriteStats(batches=1)
+        started = time.perf_counter()
+        writer = self.db.bulk_writer()
+        # Callbacks run on the BulkWriter's executor threads
+        lock = threading.Lock()
+
+        def on_error(failure, bulk_writer) -> bool:
+            """
+            :param failure: BulkWriteFailure of one write.
+            :param bulk_writer: The BulkWriter that ran it.
+            :return: Whether to retry the write.
+            """
+            if failure.attempts < self.max_retries:
+                return True
+            with lock:
+                stats.failed += 1
+                failed_ids.add(failure.operation.reference.id)
+            self.logger.error(f"Bulk write to {failure.operation.reference.path} failed: {failure.message}")
+            return False
+
+        writer.on_write_error(on_error)
+        for ref, payload in documents:
+            writer.set(ref, payload)
+        writer.close()
+
+        stats.written = len(documents) - stats.failed
+        stats.elapsed = time.perf_counter() - started
+        return stats
+
+    async def write(self, events: Iterable[EventItem]) -> WriteStats:
+        """
+        Writes events to Firestore without blocking the event loop.
+
+        :param events: Events to store.
+        :return: WriteStats with counts, batches and elapsed time.
+        """
+        all_documents = documents = self._documents(events)
+        if not documents:
+            return WriteStats()
+
+        skipped = 0
+        if self.skip_unchanged:
+            try:
+                changed = await asyncio.to_thread(self._changed, documents)
+            except Exception as e:
+                # Without the stored hashes nothing is known to be safe; count the chunk as failed
+                self.logger.error(f"Reading stored hashes of {len(documents)} docs failed: {e}")
+                return WriteStats(failed=len(documents))
+            skipped = len(documents) - len(changed)
+            documents = changed
+
+        failed_ids: Set[str] = set()
+        stats = WriteStats()
+        if documents:
+            write = self._write_bulk if self.use_bulk_writer else self._write_batches
+            stats = await asyncio.to_thread(write, documents, failed_ids)
+        stats.skipped = skipped
+
+        if self.seen_index is not None:
+            await asyncio.to_thread(self.seen_index.mark, [
+                (ref.id, payload["content_hash"], payload.get("start_date"))
+                for ref, payload in all_documents
+                if ref.id not in failed_ids
+            ])
+
+        if not documents:
+            self.logger.info(f"All {skipped} events unchanged, nothing to store")
+            return stats
+        self.logger.info(
+            f"Stored {stats.written} events in {stats.batches} batches, {stats.skipped} unchanged, {stats.failed} failed, "
+            f"{stats.elapsed:.2f}s ({stats.throughput:.0f} events/s)"
+        )
+        return stats
+
+    def _accumulate(self, stats: WriteStats) -> None:
+        self.stats.written += stats.written
+        self.stats.skipped += stats.skipped
+        self.stats.failed += stats.failed
+        self.stats.batches += stats.batches
+        self.stats.elapsed += stats.elapsed
+
+    async def process(self, batch: List[EventItem]) -> List[EventItem]:
+        self._buffer.extend(batch)
+        while len(self._buffer) >= self.batch_size:
+            # Trim the buffer only once the chunk is written, so a failed write is retried
+            self._accumulate(await self.write(self._buffer[:self.batch_size]))
+            del self._buffer[:self.batch_size]
+        return batch
+
+    async def close(self) -> None:
+        if self._buffer:
+            self._accumulate(await self.write(list(self._buffer)))
+            self._buffer.clear()
@@ -0,0 +1,142 @@
+import math
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+from event_model import EventItem
+
+EARTH_RADIUS_KM = 6371.0
+
+# Kilometres per degree of latitude
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def has_coordinates(event: EventItem) -> bool:
+    return event.latitude is not None and event.longitude is not None
+
+
+def distance_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    # Haversine great-circle distance
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class _Cell:
+    __slots__ = ("lats", "lons", "items")
+
+    def __init__(self):
+        self.lats = array("d")
+        self.lons = array("d")
+        self.items: List[Any] = []
+
+
+class GeoIndex:
+    """
+    Grid-bucket spatial index for radius and bounding-box queries.
+
+    Points are bucketed into fixed-size latitude/longitude cells, each
+    holding its coordinates in flat arrays, so a query only scans the cells
+    overlapping the search area instead of every event. Columns wrap around
+    the antimeridian.
+    """
+
+    def __init__(self, cell_degrees: float = 0.01):
+        self.cell_degrees = cell_degrees
+        self.columns = int(round(360 / cell_degrees))
+        self._cells: Dict[Tuple[int, int], _Cell] = {}
+        self._size = 0
+
+    @classmethod
+    def from_events(cls, events: Iterable[EventItem], cell_degrees: float = 0.01) -> "GeoIndex":
+        """
+        Builds an index over events; events without coordinates are left out.
+        """
+        index = cls(cell_degrees)
+        for event in events:
+            if has_coordinates(event):
+                index.add(event.latitude, event.longitude, event)
+        return index
+
+    def _row(self, lat: float) -> int:
+        return int(math.floor((lat + 90) / self.cell_degrees))
+
+    def _column(self, lon: float) -> int:
+        return int(math.floor((lon + 180) / self.cell_degrees)) % self.columns
+
+    def _column_range(self, west: float, east: float) -> Iterator[int]:
+        first = int(math.floor((west + 180) / self.cell_degrees))
+        last = int(math.floor((east + 180) / self.cell_degrees))
+        if west > east:
+            last += self.columns
+        span = min(last - first + 1, self.columns)
+        return ((first + offset) % self.columns for offset in range(span))
+
+    def _scan(self, south: float, west: float, north: float, east: float) -> Iterator[Tuple[float, float, Any]]:
+        rows = range(self._row(max(south, -90.0)), self._row(min(north, 90.0)) + 1)
+        columns = list(self._column_range(west, east))
+        if len(rows) * len(columns) > len(self._cells):
+            # Sparse index: walking the occupied cells is cheaper than the grid
+            wanted_columns = set(columns)
+            cells = [cell for (row, column), cell in self._cells.items() if row in rows and column in wanted_columns]
+        else:
+            cells = [self._cells[key] for key in ((row, column) for row in rows for column in columns) if key in self._cells]
+        for cell in cells:
+            yield from zip(cell.lats, cell.lons, cell.items)
+
+    def add(self, lat: float, lon: float, item: Any) -> None:
+        key = (self._row(lat), self._column(lon))
+        cell = self._cells.get(key)
+        if cell is None:
+            cell = self._cells[key] = _Cell()
+        cell.lats.append(lat)
+        cell.lons.append(lon)
+        cell.items.append(item)
+        self._size += 1
+
+    def within(self, lat: float, lon: float, radius_km: float) -> List[Tuple[float, Any]]:
+        """
+        Finds the items within a radius of a point.
+
+        :param lat: Latitude of the centre.
+        :param lon: Longitude of the centre.
+        :param radius_km: Search radius in kilometres.
+        :return: (distance in km, item) pairs, nearest first.
+        """
+        d_lat = radius_km / KM_PER_DEGREE
+        # Degrees of longitude shrink towards the poles, so size the span for
+        # the box edge nearest a pole rather than the centre
+        max_lat = abs(lat) + d_lat
+        d_lon = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(min(max_lat, 90.0))), 1e-6))
+        if d_lon >= 180 or max_lat >= 90:
+            # The circle reaches a pole, or wraps the globe: every longitude qualifies
+            west, east = -180.0, 180.0 - 1e-9
+        else:
+            west, east = (lon + 180 - d_lon) % 360 - 180, (lon + 180 + d_lon) % 360 - 180
+
+        found = []
+        for point_lat, point_lon, item in self._scan(lat - d_lat, west, lat + d_lat, east):
+            distance = distance_km(lat, lon, point_lat, point_lon)
+            if distance <= radius_km:
+                found.append((distance, item))
+        found.sort(key=lambda pair: pair[0])
+        return found
+
+    def in_bbox(self, south: float, west: float, north: float, east: float) -> List[Any]:
+        """
+        Finds the items inside a bounding box. A box with west > east
+        crosses the antimeridian.
+
+        :return: Items inside the box, in no particular order.
+        """
+        crosses = west > east
+        return [
+            item
+            for point_lat, point_lon, item in self._scan(south, west, north, east)
+            if south <= point_lat <= north
+            and ((west <= point_lon or point_lon <= east) if crosses else west <= point_lon <= east)
+        ]
+
+    def __len__(self) -> int:
+        return self._size
@@ -0,0 +1,138 @@
+import asyncio
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+
+
+@dataclass
+class HttpResponse:
+    """
+    Fully read HTTP response returned by the shared transport.
+    The body is kept as raw bytes so callers can decide how to decode it.
+    """
+
+    url: str
+    status: int
+    headers: Dict[str, str] = field(default_factory=dict)
+    body: bytes = b""
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 300
+
+    def json(self) -> Any:
+        return json.loads(self.body) if self.body else {}
+
+    def raise_for_status(self) -> None:
+        if not self.ok:
+            raise HttpError(self)
+
+
+class HttpError(Exception):
+    def __init__(self, response: HttpResponse):
+        super().__init__(f"HTTP {response.status} for {response.url}")
+        self.response = response
+
+
+class HttpTransport:
+    """
+    Shared non-blocking HTTP transport used by all agents.
+
+    A single aiohttp session is created lazily and reused for every request,
+    so keep-alive connections are pooled per host, DNS lookups are cached
+    and the number of open connections to one host is capped.
+    """
+
+    def __init__(
+        self,
+        limit: int = 100,
+        limit_per_host: int = 10,
+        dns_cache_ttl: int = 300,
+        keepalive_timeout: float = 30.0,
+        timeout: float = 30.0,
+        trace_configs: Optional[List[aiohttp.TraceConfig]] = None,
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = timeout
+        self.trace_configs = trace_configs
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._lock = asyncio.Lock()
+
+    async def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            async with self._lock:
+                if self._session is None or self._session.closed:
+                    connector = aiohttp.TCPConnector(
+                        limit=self.limit,
+                        limit_per_host=self.limit_per_host,
+                        ttl_dns_cache=self.dns_cache_ttl,
+                        use_dns_cache=True,
+                        keepalive_timeout=self.keepalive_timeout,
+                    )
+                    self._session = aiohttp.ClientSession(
+                        connector=connector,
+                        timeout=aiohttp.ClientTimeout(total=self.timeout),
+                        headers={"Accept-Encoding": "gzip, deflate"},
+                        trace_configs=self.trace_configs,
+                    )
+        return self._session
+
+    async def get(
+        self,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> HttpResponse:
+        """
+        Performs a GET request and reads the whole (decompressed) body.
+
+        :param url: Request URL.
+        :param params: Query string parameters.
+        :param headers: Extra request headers.
+        :return: HttpResponse with status, headers and raw body.
+        """
+        session = await self.session()
+        params = {k: str(v) for k, v in (params or {}).items() if v is not None}
+        async with session.get(url, params=params, headers=headers) as response:
+            body = await response.read()
+            return HttpResponse(
+                url=str(response.url),
+                status=response.status,
+                headers=dict(response.headers),
+                body=body,
+            )
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+_transport: Optional[HttpTransport] = None
+
+
+def configure_transport(**options: Any) -> HttpTransport:
+    """
+    Replaces the shared transport with one built from the given options
+    (typically the ``http`` section of config.yaml).
+    """
+    global _transport
+    _transport = HttpTransport(**options)
+    return _transport
+
+
+def get_transport() -> HttpTransport:
+    global _transport
+    if _transport is None:
+        _transport = HttpTransport()
+    return _transport
+
+
+async def close_transport() -> None:
+    if _transport is not None:
+        await _transport.close()
@@ -0,0 +1,141 @@
+import atexit
+import gzip
+import json
+import logging
+import os
+import queue
+import shutil
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional
+
+CONSOLE_FORMAT = "%(asctime)s [%(levelname)s] %(name)s: %(message)s"
+
+# Attributes every LogRecord has; anything else was passed through ``extra``
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats records as one JSON object per line. Fields passed through
+    ``extra`` (agent, source, request, latency_ms, ...) become top-level keys.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def _gzip_rotator(source: str, dest: str) -> None:
+    with open(source, "rb") as raw, gzip.open(dest, "wb") as compressed:
+        shutil.copyfileobj(raw, compressed)
+    os.remove(source)
+
+
+_listener: Optional[QueueListener] = None
+
+
+def configure_logging(
+    level: str = "INFO",
+    path: str = "logs/agent_log.jsonl",
+    max_bytes: int = 10 * 1024 * 1024,
+    backup_count: int = 5,
+    compress: bool = True,
+    console: bool = True,
+) -> QueueListener:
+    """
+    Sets up logging from the ``logging`` section of config.yaml.
+
+    Loggers only put records on an in-memory queue; a background listener
+    thread formats them and does the file and console I/O, so logging never
+    blocks the event loop. The file gets JSON lines and is rotated at
+    ``max_bytes``, with rotated files gzip-compressed when ``compress`` is set.
+    """
+    global _listener
+    close_logging()
+
+    handlers = []
+    if path:
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        file_handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+        file_handler.setFormatter(JsonFormatter())
+        if compress:
+            file_handler.namer = lambda name: name + ".gz"
+            file_handler.rotator = _gzip_rotator
+        handlers.append(file_handler)
+    if console:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+        handlers.append(console_handler)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+class _Relay(logging.Handler):
+    """
+    Hands records received from worker processes to the local logger of the
+    same name, so they go through this process's handlers.
+    """
+
+    def emit(self, record: logging.LogRecord) -> None:
+        logging.getLogger(record.name).handle(record)
+
+
+def relay_worker_logs(log_queue) -> QueueListener:
+    """
+    Starts a listener that relays records sent by worker processes set up
+    with configure_worker_logging. Stop it after the workers exit.
+
+    :param log_queue: A multiprocessing queue shared with the workers.
+    """
+    listener = QueueListener(log_queue, _Relay())
+    listener.start()
+    return listener
+
+
+def configure_worker_logging(log_queue, level: int = logging.INFO) -> None:
+    """
+    Process pool initializer: replaces whatever logging setup the worker
+    inherited with a handler that sends every record to the parent.
+    """
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(level)
+
+
+def close_logging() -> None:
+    """
+    Flushes queued records and stops the listener thread.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+    _listener = None
+
+
+atexit.register(close_logging)
@@ -1,68 +1,201 @@
+import argparse
 import asyncio
 import json
-from datetime import datetime, timedelta
-from agents.agent_ticketmaster import TicketmasterAgent
-from agents.agent_serpapi import SerpApiAgent
-from agents.agent_predicthq import PredictHQAgent
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
 from config_loader import load_config
-from firebase_admin import credentials, firestore, initialize_app
+from http_transport import configure_transport, close_transport
+from logging_config import configure_logging, close_logging
+from metrics import close_metrics, configure_metrics, get_metrics
+from parse_pool import configure_parse_pool, close_parse_pool
+from rate_limiter import configure_rate_limiter
+from response_cache import configure_cache, round_now
+from scheduler import DATE_FORMAT, BatchQuery, JobResult, SourceScheduler, build_jobs, load_queries
+from watermarks import WatermarkStore
+from firestore_writer import FirestoreWriter, WriteStats
+from pipeline import Pipeline, PrintStage, Stage
+from dedup import DedupEngine, DedupStage
+from export import create_export_stage
+from seen_index import SeenFilterStage, SeenIndex
+
+def configure_shared(config: dict) -> datetime:
+    """
+    Sets up the process-wide metrics, HTTP transport, response cache, rate
+    limiter and parse pool from config.
+
+    :return: The (possibly rounded) current time to fetch from.
+    """
+    configure_metrics(**config.get("metrics", {}))
+    cache_config = config.get("cache", {"enabled": False})
+    configure_transport(**config.get("http", {}))
+    configure_cache(**cache_config)
+    configure_rate_limiter(**config.get("rate_limits", {}))
+    configure_parse_pool(**config.get("parse_pool", {}))
+    return round_now(datetime.utcnow(), cache_config.get("now_rounding_minutes", 0))
+
+
+def open_storage(config: dict, db: Any) -> Tuple[FirestoreWriter, Optional[SeenIndex]]:
+    """
+    Creates the Firestore writer and, if enabled, the seen-events index it records into.
+    """
+    seen_config = config.get("seen_index", {})
+    seen_index = None
+    if seen_config.get("enabled", False):
+        seen_index = SeenIndex(**{k: v for k, v in seen_config.items() if k != "enabled"})
+
+    firebase_config = config["firebase"]
+    writer = FirestoreWriter(
+        db,
+        batch_size=firebase_config.get("batch_size", 500),
+        use_bulk_writer=firebase_config.get("bulk_writer", False),
+        skip_unchanged=firebase_config.get("skip_unchanged", True),
+        seen_index=seen_index,
+    )
+    return writer, seen_index
+
+
+def open_export(config: dict) -> Optional[Stage]:
+    """
+    Builds the export stage from the ``export`` section, or None when exports are disabled.
+    """
+    export_config = config.get("export", {})
+    if not export_config.get("enabled", True):
+        return None
+    return create_export_stage(**{k: v for k, v in export_config.items() if k != "enabled"})
+
+
+def build_pipeline(
+    config: dict,
+    writer: FirestoreWriter,
+    seen_index: Optional[SeenIndex],
+    export: Optional[Stage] = None,
+    dedup: Optional[DedupEngine] = None,
+) -> Pipeline:
+    """
+    Builds the dedup → export → seen filter → print → storage chain around
+    the given export stage (see open_export), if any. ``dedup`` replaces the
+    engine built from the ``dedup`` section, for callers that keep one.
+    Stages are closed when a run ends; only the writer, seen index and a
+    given dedup engine are reusable.
+    """
+    stages = []
+    dedup_config = config.get("dedup", {})
+    if dedup_config.get("enabled", True):
+        engine = dedup if dedup is not None else DedupEngine(**{k: v for k, v in dedup_config.items() if k != "enabled"})
+        stages.append(DedupStage(engine))
+    if export is not None:
+        stages.append(export)
+    if seen_index is not None:
+        stages.append(SeenFilterStage(seen_index))
+    pipeline_config = config.get("pipeline", {})
+    if pipeline_config.get("print_events", True):
+        stages.append(PrintStage())
+    stages.append(writer)
+    return Pipeline(stages, queue_size=pipeline_config.get("queue_size", 8), batch_size=config["firebase"].get("batch_size", 500))
+
+
+def record_job_metrics(result: JobResult) -> None:
+    metrics = get_metrics()
+    metrics.inc("jobs_total", source=result.job.source, status="ok" if result.ok else "failed")
+    metrics.observe("job_seconds", result.elapsed, source=result.job.source)
+
+
+def init_firestore(config: dict) -> Any:
+    from firebase_admin import credentials, firestore, initialize_app
 
-async def main():
-    config = load_config()
-    now = datetime.utcnow()
-
-    # Инициализация Firebase
     cred_path = config["firebase"]["service_account"]
     cred = credentials.Certificate(cred_path)
     initialize_app(cred)
-    db = firestore.client()
-
-    all_events = []
-
-    if config["ticketmaster"]["enabled"]:
-        tm_agent = TicketmasterAgent()
-        tm_data = {
-            "city": config["ticketmaster"]["default_city"],
-            "start_datetime": now.strftime('%Y-%m-%dT%H:%M:%SZ'),
-            "end_datetime": (now + timedelta(days=config["ticketmaster"].get("default_days", 1))).strftime('%Y-%m-%dT%H:%M:%SZ'),
-            "api_key": config["ticketmaster"]["api_key"],
-            "size": config["ticketmaster"]["default_size"],
-            "max_pages": config["ticketmaster"].get("max_pages", 1)
-        }
-        events = await tm_agent.process(tm_data)
-        all_events.extend(events)
-
-    if config["serpapi"]["enabled"]:
-        serp_agent = SerpApiAgent()
-        serp_data = {
-            "city": config["serpapi"]["default_city"],
-            "start_datetime": now.strftime('%Y-%m-%dT%H:%M:%SZ'),
-            "end_datetime": (now + timedelta(days=config["serpapi"].get("default_days", 1))).strftime('%Y-%m-%dT%H:%M:%SZ'),
-            "api_key": config["serpapi"]["api_key"],
-            "keyword": config["serpapi"].get("default_keyword", ""),
-            "size": config["serpapi"]["default_size"],
-            "max_pages": config["serpapi"].get("max_pages", 1)
-        }
-        events = await serp_agent.process(serp_data)
-        all_events.extend(events)
-
-    if config["predicthq"]["enabled"]:
-        phq_agent = PredictHQAgent()
-        phq_data = {
-            "city": config["predicthq"]["default_city"],
-            "start_datetime": now.strftime('%Y-%m-%dT%H:%M:%SZ'),
-            "end_datetime": (now + timedelta(days=config["predicthq"].get("default_days", 1))).strftime('%Y-%m-%dT%H:%M:%SZ'),
-            "api_key": config["predicthq"]["api_key"],
-            "size": config["predicthq"]["default_size"],
-            "max_pages": config["predicthq"].get("max_pages", 1)
-        }
-        events = await phq_agent.process(phq_data)
-        all_events.extend(events)
-
-    print(f"\n✅ Total events fetched: {len(all_events)}")
-    for event in all_events:
-        print(f"- {event.title} | {event.start_date} | {event.city}")
-        db.collection("events").document().set(event.model_dump(mode="json"))
+    return firestore.client()
+
+
+async def run(config: dict, db: Any, queries: Optional[List[BatchQuery]] = None) -> Tuple[List[JobResult], WriteStats]:
+    """
+    Runs one collection pass: fetches every configured source and streams
+    the events through dedup, export and storage.
+
+    All jobs share one HTTP transport, rate limiter, dedup stage and writer,
+    so a batch of many cities pays the setup cost once.
+
+    :param config: Loaded config.yaml.
+    :param db: Firestore client, or anything with the same collection/batch/get_all API.
+    :param queries: Batch queries; defaults to the ``batch`` section of config, or each source's default city.
+    :return: Per-job results and the storage totals.
+    """
+    now = configure_shared(config)
+    seen_index = None
+    try:
+        incremental_config = config.get("incremental", {})
+        watermarks = None
+        if incremental_config.get("enabled", False):
+            watermarks = WatermarkStore(
+                path=incremental_config.get("path", "state/watermarks.json"),
+                refresh_days=incremental_config.get("refresh_days", 2),
+                max_age_days=incremental_config.get("max_age_days", 7),
+            )
+
+        writer, seen_index = open_storage(config, db)
+        pipeline = build_pipeline(config, writer, seen_index, open_export(config))
+
+        scheduler = SourceScheduler.from_config(config)
+        if queries is None:
+            queries = load_queries(config)
+        results = await pipeline.run(scheduler, build_jobs(config, now, watermarks, queries))
+
+        total_events = 0
+        for result in results:
+            status = "ok" if result.ok else f"failed ({result.error!r})"
+            print(f"{result.job.source} [{result.job.data['city']}]: {result.count} events in {result.elapsed:.1f}s, {status}")
+            total_events += result.count
+            record_job_metrics(result)
+            if watermarks is not None and result.ok and result.job.watermark_key:
+                watermarks.record(
+                    result.job.watermark_key,
+                    datetime.strptime(result.job.data["start_datetime"], DATE_FORMAT),
+                    datetime.strptime(result.job.data["end_datetime"], DATE_FORMAT),
+                    now,
+                )
+
+        stats = writer.stats
+        print(f"\n✅ Total events fetched: {total_events}")
+        print(f"💾 Stored {stats.written} events ({stats.skipped} unchanged, {stats.failed} failed) in {stats.elapsed:.1f}s")
+
+        # Only advance watermarks once the fetched events are safely stored: failed jobs are
+        # never recorded, and a failed write or a batch dropped by a stage discards them all
+        if watermarks is not None:
+            if stats.failed or pipeline.errors:
+                print(f"⚠️ Watermarks not saved: {stats.failed} failed writes, {pipeline.errors} stage errors")
+            else:
+                watermarks.save()
+
+        if seen_index is not None:
+            seen_index.compact()
+    finally:
+        # Release the session, worker processes and metrics thread even when the run fails
+        if seen_index is not None:
+            seen_index.close()
+        await close_transport()
+        close_parse_pool()
+        close_metrics()
+    return results, stats
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Collect events from all enabled sources")
+    parser.add_argument("--config", default="config.yaml")
+    parser.add_argument("--jobs", help="YAML/JSON file of batch queries (city, days, keyword, categories), overriding batch.file")
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    configure_logging(**config.get("logging", {}))
+
+    # Инициализация Firebase
+    db = init_firestore(config)
+
+    try:
+        await run(config, db, load_queries(config, args.jobs))
+    finally:
+        close_logging()
 
 if __name__ == "__main__":
     asyncio.run(main())
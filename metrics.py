@@ -0,0 +1,197 @@
+import bisect
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+PREFIX = "event_agent_"
+
+# Upper bounds in seconds, from a fast cache hit to a slow paginated request
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, object]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items() if value is not None))
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, value in pairs)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + "}"
+
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.count = 0
+
+
+class MetricsRegistry:
+    """
+    In-process counters and latency histograms, labelled by source,
+    endpoint, stage and so on, rendered in the Prometheus text format.
+
+    Recording is a dict update under a lock, cheap enough for the request
+    and parse hot paths and safe from the worker threads used for storage.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, _Histogram]] = {}
+        self._help: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def describe(self, name: str, help_text: str) -> None:
+        self._help[name] = help_text
+
+    def inc(self, name: str, value: float = 1, **labels: object) -> None:
+        key = _labels(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels: object) -> None:
+        key = _labels(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(len(self.buckets) + 1)
+            histogram.counts[bisect.bisect_left(self.buckets, value)] += 1
+            histogram.sum += value
+            histogram.count += 1
+
+    def total(self, name: str, **labels: object) -> float:
+        """
+        Sums a counter over every series carrying the given labels.
+        """
+        wanted = set(_labels(labels))
+        with self._lock:
+            return sum(value for key, value in self._counters.get(name, {}).items() if wanted <= set(key))
+
+    @contextmanager
+    def timer(self, name: str, **labels: object) -> Iterator[None]:
+        """
+        Observes the wall time of the block, also around awaits.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                full = PREFIX + name
+                if name in self._help:
+                    lines.append(f"# HELP {full} {self._help[name]}")
+                lines.append(f"# TYPE {full} counter")
+                for labels, value in sorted(series.items()):
+                    lines.append(f"{full}{_format_labels(labels)} {value:g}")
+            for name, series in sorted(self._histograms.items()):
+                full = PREFIX + name
+                if name in self._help:
+                    lines.append(f"# HELP {full} {self._help[name]}")
+                lines.append(f"# TYPE {full} histogram")
+                for labels, histogram in sorted(series.items()):
+                    cumulative = 0
+                    for bound, count in zip(self.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f"{full}_bucket{_format_labels(labels, ('le', f'{bound:g}'))} {cumulative}")
+                    lines.append(f"{full}_bucket{_format_labels(labels, ('le', '+Inf'))} {histogram.count}")
+                    lines.append(f"{full}_sum{_format_labels(labels)} {histogram.sum:.6f}")
+                    lines.append(f"{full}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str) -> None:
+        """
+        Writes the current metrics to a Prometheus text file (atomically,
+        so a node_exporter textfile collector never sees a partial file).
+        """
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            file.write(self.render())
+        os.replace(tmp_path, path)
+
+
+def _handler_for(registry: MetricsRegistry) -> type:
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args) -> None:
+            pass
+
+    return MetricsHandler
+
+
+_registry = MetricsRegistry()
+_path: Optional[str] = None
+_server: Optional[ThreadingHTTPServer] = None
+
+
+def configure_metrics(path: Optional[str] = "metrics/metrics.prom", port: Optional[int] = None, host: str = "127.0.0.1") -> MetricsRegistry:
+    """
+    Sets up metrics output from the ``metrics`` section of config.yaml.
+
+    :param path: Prometheus text file written by ``close_metrics``; None to skip.
+    :param port: Serve ``/metrics`` on this local port while running; None to skip.
+    :param host: Interface the endpoint binds to.
+    """
+    global _path, _server
+    _path = path
+    if _server is not None:
+        _server.shutdown()
+        _server = None
+    if port is not None:
+        _server = ThreadingHTTPServer((host, port), _handler_for(_registry))
+        threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+        logging.getLogger("Metrics").info(f"Serving metrics on http://{host}:{port}/metrics")
+    return _registry
+
+
+def get_metrics() -> MetricsRegistry:
+    return _registry
+
+
+def flush_metrics() -> None:
+    """
+    Writes the metrics file now, for processes that run longer than one pass.
+    """
+    if _path:
+        _registry.write(_path)
+
+
+def close_metrics() -> None:
+    """
+    Writes the metrics file and stops the HTTP endpoint.
+    """
+    global _server
+    flush_metrics()
+    if _server is not None:
+        _server.shutdown()
+        _server.server_close()
+        _server = None
@@ -0,0 +1,115 @@
+import asyncio
+import json
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import orjson
+
+    loads = orjson.loads
+except ImportError:
+    loads = json.loads
+
+from logging_config import configure_worker_logging, relay_worker_logs
+
+# Agents created lazily inside each worker process
+_worker_agents: Dict[str, Any] = {}
+
+
+def _field_names() -> Tuple[str, ...]:
+    from event_model import EventItem
+
+    return tuple(EventItem.model_fields)
+
+
+def parse_payload(source: str, payload: bytes) -> List[tuple]:
+    """
+    Worker entry point: decodes a raw page body and runs the source's
+    parser over it. Events come back as tuples in EventItem field order,
+    which pickle far smaller than dicts.
+    """
+    if source not in _worker_agents:
+        from scheduler import AGENT_CLASSES
+
+        _worker_agents[source] = AGENT_CLASSES[source]()
+    agent = _worker_agents[source]
+    names = _field_names()
+    return [
+        tuple(fields.get(name) for name in names)
+        for fields in (agent.event_fields(event) for event in agent.page_events(loads(payload)))
+    ]
+
+
+class ParsePool:
+    """
+    Optional parse stage that runs page decoding and event parsing in a
+    process pool, keeping the event loop free to drive I/O and using every
+    core on the ingest box.
+
+    Workers are started from a fork server (spawned where that is not
+    available) rather than forked, so they don't inherit the event loop,
+    open connections or the logging listener thread. Their log records are
+    sent back and handled by this process's logging setup.
+    """
+
+    def __init__(self, workers: Optional[int] = None):
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context("forkserver")
+            # Import the parsers once in the server instead of in every worker
+            context.set_forkserver_preload(["parse_pool", "scheduler"])
+        else:
+            context = multiprocessing.get_context("spawn")
+        self.log_queue = context.Queue()
+        self.log_listener = relay_worker_logs(self.log_queue)
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=configure_worker_logging,
+            initargs=(self.log_queue, logging.getLogger().getEffectiveLevel()),
+        )
+        self.fields = _field_names()
+
+    async def parse(self, source: str, payload: bytes) -> List[Dict[str, Any]]:
+        """
+        Parses a raw page body in a worker process.
+
+        :param source: Source name of the agent whose parser to use.
+        :param payload: Raw JSON response body.
+        :return: Dicts of EventItem fields, ready for build_events.
+        """
+        loop = asyncio.get_running_loop()
+        rows = await loop.run_in_executor(self.executor, parse_payload, source, payload)
+        return [dict(zip(self.fields, row)) for row in rows]
+
+    def close(self) -> None:
+        # Wait for the workers: one still starting up needs the queues intact,
+        # and their last log records should make it through the relay
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        self.log_listener.stop()
+
+
+_pool: Optional[ParsePool] = None
+
+
+def configure_parse_pool(enabled: bool = False, workers: Optional[int] = None) -> Optional[ParsePool]:
+    """
+    Sets up the shared parse pool from the ``parse_pool`` section of config.yaml.
+    """
+    global _pool
+    if _pool is not None:
+        _pool.close()
+    _pool = ParsePool(workers) if enabled else None
+    return _pool
+
+
+def get_parse_pool() -> Optional[ParsePool]:
+    return _pool
+
+
+def close_parse_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.close()
+    _pool = None
@@ -0,0 +1,158 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import List, NamedTuple, Optional
+
+from event_model import EventItem
+from metrics import get_metrics
+from scheduler import AgentJob, JobResult, SourceScheduler
+
+
+class Watermark(NamedTuple):
+    """
+    Queue marker: no event starting before ``value`` (naive UTC) follows it.
+    """
+
+    value: datetime
+
+
+class Stage:
+    """
+    A downstream pipeline stage (dedup, storage, export, ...).
+
+    ``process`` receives one batch of events and returns the batch to pass
+    on to the next stage; returning an empty list drops the batch.
+    ``advance`` is called as the agents' low watermark moves on; stages that
+    hold events back (dedup) return the ones that can no longer change.
+    ``close`` is called once after the last batch to flush any buffers;
+    events it returns are passed on like one more batch.
+    ``name`` labels the stage's metrics.
+    """
+
+    name = "stage"
+
+    async def process(self, batch: List[EventItem]) -> List[EventItem]:
+        return batch
+
+    async def advance(self, watermark: datetime) -> List[EventItem]:
+        return []
+
+    async def close(self) -> Optional[List[EventItem]]:
+        pass
+
+
+class PrintStage(Stage):
+    name = "print"
+
+    async def process(self, batch: List[EventItem]) -> List[EventItem]:
+        for event in batch:
+            print(f"- {event.title} | {event.start_date} | {event.city}")
+        return batch
+
+
+class Pipeline:
+    """
+    Streams event batches from the agents through a chain of stages.
+
+    Every stage runs as its own task and reads from a bounded queue, so a
+    slow stage (e.g. storage) applies backpressure all the way back to the
+    agents instead of letting events pile up in memory.
+
+    Ahead of each batch the scheduler's low watermark, when it has moved,
+    travels down the queues as a Watermark marker, so every stage sees it in
+    order with the batches.
+
+    A stage that raises on a batch drops that batch and the pipeline goes
+    on; ``errors`` counts such failures of the last run.
+    """
+
+    def __init__(self, stages: List[Stage], queue_size: int = 8, batch_size: int = 500):
+        """
+        :param stages: Stages in order.
+        :param queue_size: Batches buffered between two stages.
+        :param batch_size: Size of the batches that events returned by a
+            stage's ``advance`` or ``close`` are split into.
+        """
+        self.stages = stages
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.errors = 0
+        self.logger = logging.getLogger("Pipeline")
+
+    async def _forward(self, events: Optional[List[EventItem]], outbox: Optional[asyncio.Queue]) -> None:
+        if events and outbox is not None:
+            for start in range(0, len(events), self.batch_size):
+                await outbox.put(events[start:start + self.batch_size])
+
+    async def _run_stage(self, stage: Stage, inbox: asyncio.Queue, outbox: Optional[asyncio.Queue]) -> None:
+        metrics = get_metrics()
+        while True:
+            batch = await inbox.get()
+            if batch is None:
+                break
+            if isinstance(batch, Watermark):
+                try:
+                    with metrics.timer("stage_seconds", stage=stage.name):
+                        released = await stage.advance(batch.value)
+                except Exception as e:
+                    metrics.inc("stage_errors_total", stage=stage.name)
+                    self.errors += 1
+                    self.logger.error(f"{type(stage).__name__} failed to advance to {batch.value}: {e}")
+                else:
+                    await self._forward(released, outbox)
+                if outbox is not None:
+                    await outbox.put(batch)
+                continue
+            metrics.inc("stage_events_total", len(batch), stage=stage.name)
+            try:
+                with metrics.timer("stage_seconds", stage=stage.name):
+                    batch = await stage.process(batch)
+            except Exception as e:
+                metrics.inc("stage_errors_total", stage=stage.name)
+                self.errors += 1
+                self.logger.error(f"{type(stage).__name__} failed on a batch of {len(batch)} events: {e}")
+                continue
+            if batch and outbox is not None:
+                await outbox.put(batch)
+        try:
+            with metrics.timer("stage_seconds", stage=stage.name):
+                remaining = await stage.close()
+            await self._forward(remaining, outbox)
+        finally:
+            if outbox is not None:
+                await outbox.put(None)
+
+    async def run(self, scheduler: SourceScheduler, jobs: List[AgentJob]) -> List[JobResult]:
+        """
+        Runs all jobs and pushes their batches through the stages.
+
+        :param scheduler: Scheduler enforcing per-source concurrency and deadlines.
+        :param jobs: Jobs to run.
+        :return: One JobResult per job with its event count.
+        """
+        self.errors = 0
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self.stages]
+        stage_tasks = [
+            asyncio.ensure_future(self._run_stage(stage, queues[i], queues[i + 1] if i + 1 < len(queues) else None))
+            for i, stage in enumerate(self.stages)
+        ]
+
+        last_watermark: Optional[datetime] = None
+
+        async def sink(batch: List[EventItem]) -> None:
+            nonlocal last_watermark
+            if not queues:
+                return
+            watermark = scheduler.low_watermark()
+            if watermark is not None and (last_watermark is None or watermark > last_watermark):
+                last_watermark = watermark
+                await queues[0].put(Watermark(watermark))
+            await queues[0].put(batch)
+
+        try:
+            results = await scheduler.stream(jobs, sink)
+        finally:
+            if queues:
+                await queues[0].put(None)
+            await asyncio.gather(*stage_tasks)
+        return results
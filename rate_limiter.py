@@ -0,0 +1,214 @@
+import asyncio
+import hashlib
+import logging
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Dict, Optional
+
+from http_transport import HttpResponse
+from metrics import get_metrics
+
+# Statuses that mean "slow down" rather than "this request is wrong"
+THROTTLE_STATUSES = {429, 503}
+
+
+def retry_after_delay(headers: Dict[str, str]) -> Optional[float]:
+    """
+    Reads how long the server wants us to wait from ``Retry-After`` or the
+    rate-limit reset headers used by Ticketmaster and PredictHQ.
+
+    :return: Delay in seconds, or None when the headers give no hint.
+    """
+    headers = {k.lower(): v for k, v in headers.items()}
+
+    retry_after = headers.get("retry-after")
+    if retry_after:
+        try:
+            return max(float(retry_after), 0.0)
+        except ValueError:
+            try:
+                return max((parsedate_to_datetime(retry_after) - datetime.now(timezone.utc)).total_seconds(), 0.0)
+            except (TypeError, ValueError):
+                pass
+
+    for name in ("rate-limit-reset", "x-ratelimit-reset", "ratelimit-reset"):
+        reset = headers.get(name)
+        if not reset:
+            continue
+        try:
+            value = float(reset)
+        except ValueError:
+            continue
+        # Epoch milliseconds, epoch seconds or a relative number of seconds
+        if value > 1e12:
+            return max(value / 1000 - time.time(), 0.0)
+        if value > 1e9:
+            return max(value - time.time(), 0.0)
+        return value
+    return None
+
+
+def remaining_quota(headers: Dict[str, str]) -> Optional[int]:
+    headers = {k.lower(): v for k, v in headers.items()}
+    for name in ("rate-limit-available", "x-ratelimit-remaining", "ratelimit-remaining"):
+        if name in headers:
+            try:
+                return int(float(headers[name]))
+            except ValueError:
+                return None
+    return None
+
+
+class TokenBucket:
+    """
+    Async token bucket whose refill rate adapts to observed throttling:
+    it halves on every 429 and creeps back towards the configured rate
+    after successful requests.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None, min_rate: Optional[float] = None):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min_rate or rate / 16
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self.blocked_until - now
+                if wait <= 0 and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                if wait <= 0:
+                    wait = (1 - self.tokens) / self.rate
+                await asyncio.sleep(wait)
+
+    def pause(self, delay: float) -> None:
+        self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+
+    def throttled(self, delay: float) -> None:
+        self.rate = max(self.min_rate, self.rate / 2)
+        self.tokens = 0
+        self.pause(delay)
+
+    def succeeded(self) -> None:
+        if self.rate < self.max_rate:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+
+class RateLimiter:
+    """
+    Rate-limit layer in front of every agent request.
+
+    Keeps one TokenBucket per source and API key, waits for a token before
+    each request, and retries throttled responses with the server's
+    ``Retry-After`` hint or jittered exponential backoff.
+    """
+
+    def __init__(
+        self,
+        limits: Optional[Dict[str, dict]] = None,
+        default_rate: float = 5.0,
+        max_retries: int = 5,
+        backoff_base: float = 1.0,
+        backoff_max: float = 60.0,
+    ):
+        self.limits = limits or {}
+        self.default_rate = default_rate
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._buckets: Dict[str, TokenBucket] = {}
+        self.logger = logging.getLogger("RateLimiter")
+
+    def bucket(self, source: str, api_key: str = "") -> TokenBucket:
+        digest = hashlib.sha1(api_key.encode("utf-8")).hexdigest()[:12]
+        key = f"{source}:{digest}"
+        if key not in self._buckets:
+            limit = self.limits.get(source, {})
+            self._buckets[key] = TokenBucket(
+                rate=limit.get("rate", self.default_rate),
+                burst=limit.get("burst"),
+                min_rate=limit.get("min_rate"),
+            )
+        return self._buckets[key]
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def request(
+        self,
+        source: str,
+        api_key: str,
+        send: Callable[[], Awaitable[HttpResponse]],
+    ) -> HttpResponse:
+        """
+        Sends a request once a token is available, retrying while throttled.
+
+        :param source: Source name used to pick the configured limit.
+        :param api_key: API key the request is billed to.
+        :param send: Coroutine factory performing the actual request.
+        :return: The last response; still throttled if retries ran out.
+        """
+        bucket = self.bucket(source, api_key)
+        attempt = 0
+        while True:
+            await bucket.acquire()
+            response = await send()
+
+            if response.status not in THROTTLE_STATUSES:
+                bucket.succeeded()
+                if remaining_quota(response.headers) == 0:
+                    delay = retry_after_delay(response.headers)
+                    if delay:
+                        bucket.pause(delay)
+                return response
+
+            get_metrics().inc("throttled_total", source=source, status=response.status)
+            if attempt >= self.max_retries:
+                self.logger.warning(f"{source}: still throttled after {attempt} retries, giving up")
+                return response
+
+            delay = retry_after_delay(response.headers)
+            if delay is None:
+                delay = self.backoff(attempt)
+            else:
+                delay += random.uniform(0, self.backoff_base)
+            bucket.throttled(delay)
+            self.logger.warning(
+                f"{source}: HTTP {response.status}, retrying in {delay:.1f}s at {bucket.rate:.2f} req/s"
+            )
+            get_metrics().inc("retries_total", source=source)
+            attempt += 1
+
+
+_limiter: Optional[RateLimiter] = None
+
+
+def configure_rate_limiter(**options) -> RateLimiter:
+    """
+    Replaces the shared rate limiter with one built from the
+    ``rate_limits`` section of config.yaml.
+    """
+    global _limiter
+    _limiter = RateLimiter(**options)
+    return _limiter
+
+
+def get_rate_limiter() -> RateLimiter:
+    global _limiter
+    if _limiter is None:
+        _limiter = RateLimiter()
+    return _limiter
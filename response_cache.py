@@ -0,0 +1,145 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+from urllib.parse import urlencode, urlsplit, urlunsplit
+
+from http_transport import HttpResponse
+
+# Query parameters that carry credentials and must never be part of a cache key
+SECRET_PARAMS = {"apikey", "api_key", "key", "token", "access_token"}
+
+
+def cache_key(url: str, params: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Builds a cache key from the normalized endpoint and sorted parameters,
+    with API keys removed so the cache can be shared between keys.
+    """
+    parts = urlsplit(url)
+    endpoint = urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip("/"), "", ""))
+    items = sorted(
+        (str(k), str(v)) for k, v in (params or {}).items()
+        if v is not None and str(k).lower() not in SECRET_PARAMS
+    )
+    raw = f"{endpoint}?{parts.query}&{urlencode(items)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def round_now(now: datetime, minutes: int) -> datetime:
+    """
+    Rounds ``now`` down to a multiple of ``minutes`` so that repeated runs
+    within the same slot build identical date windows (and cache keys).
+    """
+    if not minutes:
+        return now
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    elapsed = int((now - midnight).total_seconds())
+    return midnight + timedelta(seconds=elapsed // (minutes * 60) * minutes * 60)
+
+
+class ResponseCache:
+    """
+    On-disk cache of HTTP responses backed by SQLite.
+
+    Bodies are stored zlib-compressed. Each source has its own TTL, and
+    once the stored bytes exceed ``max_bytes`` the least recently used
+    entries are evicted.
+    """
+
+    def __init__(
+        self,
+        path: str = "cache/responses.sqlite",
+        max_bytes: int = 256 * 1024 * 1024,
+        ttl: Optional[Dict[str, int]] = None,
+        default_ttl: int = 3600,
+    ):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.max_bytes = max_bytes
+        self.ttl = ttl or {}
+        self.default_ttl = default_ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, source TEXT, stored_at REAL, accessed_at REAL,"
+            " size INTEGER, status INTEGER, url TEXT, headers TEXT, body BLOB)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+        self._conn.commit()
+
+    def ttl_for(self, source: str) -> int:
+        return self.ttl.get(source, self.default_ttl)
+
+    def get(self, source: str, key: str) -> Optional[HttpResponse]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT stored_at, status, url, headers, body FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            stored_at, status, url, headers, body = row
+            if now - stored_at > self.ttl_for(source):
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        return HttpResponse(url=url, status=status, headers=json.loads(headers), body=zlib.decompress(body))
+
+    def put(self, source: str, key: str, response: HttpResponse) -> None:
+        if not response.ok or self.ttl_for(source) <= 0:
+            return
+        body = zlib.compress(response.body, 6)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, source, now, now, len(body), response.status, response.url, json.dumps(response.headers), body),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall()
+        expired = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            expired.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", expired)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_cache: Optional[ResponseCache] = None
+
+
+def configure_cache(enabled: bool = True, **options: Any) -> Optional[ResponseCache]:
+    """
+    Sets up the shared response cache from the ``cache`` section of config.yaml.
+    Options not understood by ResponseCache (e.g. now_rounding_minutes) are ignored.
+    """
+    global _cache
+    if not enabled:
+        _cache = None
+        return None
+    known = {"path", "max_bytes", "ttl", "default_ttl"}
+    _cache = ResponseCache(**{k: v for k, v in options.items() if k in known})
+    return _cache
+
+
+def get_cache() -> Optional[ResponseCache]:
+    return _cache
@@ -0,0 +1,306 @@
+import asyncio
+import json
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, Type, Union
+
+from base_agent import BaseAgent
+from config_loader import load_config
+from event_model import EventItem
+from watermarks import WatermarkStore
+from agents.agent_ticketmaster import TicketmasterAgent
+from agents.agent_serpapi import SerpApiAgent
+from agents.agent_predicthq import PredictHQAgent
+
+DATE_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+AGENT_CLASSES: Dict[str, Type[BaseAgent]] = {
+    "ticketmaster": TicketmasterAgent,
+    "serpapi": SerpApiAgent,
+    "predicthq": PredictHQAgent,
+}
+
+# Sources whose API filters by date, so a horizon can be fetched in pieces
+DATE_FILTERED_SOURCES = {"ticketmaster", "predicthq"}
+
+# Optional per-source config keys passed through to the agent unchanged
+AGENT_OPTIONS = (
+    "parallel", "page_concurrency", "classifications",
+    "location_origin", "location_offset_km", "country", "trusted_parsing", "base_url",
+)
+
+
+@dataclass
+class AgentJob:
+    """
+    A single unit of work for the scheduler: one agent call with its input data.
+    """
+
+    source: str
+    data: dict
+    timeout: Optional[float] = None
+    watermark_key: Optional[str] = None
+
+
+@dataclass
+class JobResult:
+    job: AgentJob
+    count: int = 0
+    error: Optional[Exception] = None
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class BatchQuery:
+    """
+    One entry of a batch run: what to fetch, expanded into a job per source.
+
+    Unset fields fall back to the source's defaults (``default_city``,
+    ``default_days``, ``default_keyword``). ``categories`` is either one list
+    for every source or a {source: list} mapping, since each API names its
+    categories differently; ``options`` holds per-source agent options such
+    as the PredictHQ ``location_origin`` of the city. ``priority`` weights
+    how often the daemon refreshes the query (2 = twice as often).
+    """
+
+    city: Optional[str] = None
+    days: Optional[float] = None
+    keyword: Optional[str] = None
+    categories: Union[List[str], Dict[str, List[str]], None] = None
+    sources: Optional[List[str]] = None
+    options: Dict[str, dict] = field(default_factory=dict)
+    priority: float = 1.0
+
+    def categories_for(self, source: str) -> List[str]:
+        if isinstance(self.categories, dict):
+            return list(self.categories.get(source) or [])
+        return list(self.categories or [])
+
+
+def load_queries(config: dict, path: Optional[str] = None) -> List[BatchQuery]:
+    """
+    Reads the batch queries from the ``batch`` section of config.yaml:
+    inline ``queries`` plus any listed in ``file`` (a YAML or JSON list, or a
+    mapping with a ``queries`` list).
+
+    Each query is a mapping with ``city``, ``days``, ``keyword``,
+    ``categories``, ``sources`` and ``priority`` keys; any other key naming a source
+    holds that source's agent options.
+
+    :param config: Loaded config.yaml.
+    :param path: Queries file overriding ``batch.file``.
+    :return: The queries, or an empty list when no batch is configured.
+    """
+    batch_config = config.get("batch") or {}
+    entries = list(batch_config.get("queries") or [])
+    path = path or batch_config.get("file")
+    if path:
+        loaded = load_config(path) or []
+        entries.extend((loaded.get("queries") or []) if isinstance(loaded, dict) else loaded)
+
+    queries = []
+    for entry in entries:
+        unknown = set(entry) - {"city", "days", "keyword", "categories", "sources", "priority"} - set(AGENT_CLASSES)
+        if unknown:
+            raise ValueError(f"Unknown batch query keys {sorted(unknown)} in {entry}")
+        queries.append(BatchQuery(
+            city=entry.get("city"),
+            days=entry.get("days"),
+            keyword=entry.get("keyword"),
+            categories=entry.get("categories"),
+            sources=entry.get("sources"),
+            options={source: entry[source] for source in AGENT_CLASSES if source in entry},
+            priority=entry.get("priority", 1.0),
+        ))
+    return queries
+
+
+def build_jobs(
+    config: dict,
+    now: datetime,
+    watermarks: Optional[WatermarkStore] = None,
+    queries: Optional[List[BatchQuery]] = None,
+    window: Optional[Tuple[float, float]] = None,
+) -> List[AgentJob]:
+    """
+    Builds jobs for every enabled source from its config section.
+
+    Without queries each source fetches its ``default_city``; with them,
+    every query becomes a job per source it applies to, so many cities and
+    keywords share one run. Without a watermark store there is one job per
+    source and query covering the whole horizon; with one, there is a job
+    per range that still needs fetching.
+
+    :param config: Loaded config.yaml.
+    :param now: Start of the requested date range.
+    :param watermarks: Optional store of already fetched ranges.
+    :param queries: Optional batch queries, see load_queries.
+    :param window: Optional (start, end) in days from ``now`` that limits
+        every horizon; the end may be ``math.inf``. Sources without a date
+        filter are only fetched, over their whole horizon, by the window that
+        holds the end of that horizon, so they run as rarely as the farthest
+        dates they return.
+    :return: List of AgentJob specs.
+    """
+    jobs = []
+    planned = set()
+    for query in queries or [BatchQuery()]:
+        for source in AGENT_CLASSES:
+            source_config = config.get(source, {})
+            if not source_config.get("enabled", False):
+                continue
+            if query.sources is not None and source not in query.sources:
+                continue
+
+            city = query.city or source_config["default_city"]
+            keyword = query.keyword if query.keyword is not None else source_config.get("default_keyword")
+            days = query.days if query.days is not None else source_config.get("default_days", 1)
+            categories = query.categories_for(source)
+            start, end = now, now + timedelta(days=days)
+            if window is not None and source in DATE_FILTERED_SOURCES:
+                start, end = now + timedelta(days=window[0]), now + timedelta(days=min(days, window[1]))
+            elif window is not None and not window[0] < days <= window[1]:
+                continue
+            if start >= end:
+                continue
+
+            watermark_key = None
+            ranges = [(start, end)]
+            if watermarks is not None and source in DATE_FILTERED_SOURCES:
+                watermark_key = WatermarkStore.key(source, city, keyword or "", categories)
+                ranges = watermarks.plan(watermark_key, start, end, now)
+
+            for range_start, range_end in ranges:
+                data = {
+                    "city": city,
+                    "start_datetime": range_start.strftime(DATE_FORMAT),
+                    "end_datetime": range_end.strftime(DATE_FORMAT),
+                    "api_key": source_config["api_key"],
+                    "size": source_config.get("default_size"),
+                    "max_pages": source_config.get("max_pages", 1),
+                }
+                if keyword is not None:
+                    data["keyword"] = keyword
+                if categories:
+                    data["categories"] = categories
+                data.update({key: source_config[key] for key in AGENT_OPTIONS if key in source_config})
+                options = query.options.get(source, {})
+                data.update({key: options[key] for key in AGENT_OPTIONS if key in options})
+
+                # Overlapping queries (same city and filters) would fetch the same pages twice
+                identity = (source, json.dumps(data, sort_keys=True, default=str))
+                if identity in planned:
+                    continue
+                planned.add(identity)
+
+                jobs.append(AgentJob(
+                    source=source,
+                    data=data,
+                    timeout=source_config.get("timeout"),
+                    watermark_key=watermark_key,
+                ))
+    return jobs
+
+
+class SourceScheduler:
+    """
+    Runs agent jobs concurrently.
+
+    Each source gets its own concurrency cap and per-job deadline, so a slow
+    or failing source never holds back results from the others.
+
+    While ``stream`` runs, ``low_watermark`` tells how far every unfinished
+    job has got: no job will yield another event starting before it.
+    """
+
+    def __init__(self, concurrency: Optional[Dict[str, int]] = None, default_concurrency: int = 1):
+        self.concurrency = concurrency or {}
+        self.default_concurrency = default_concurrency
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        # Per unfinished job, the start date before which it yields nothing more
+        self._progress: Dict[int, datetime] = {}
+
+    @classmethod
+    def from_config(cls, config: dict) -> "SourceScheduler":
+        concurrency = {
+            source: config[source]["concurrency"]
+            for source in AGENT_CLASSES
+            if isinstance(config.get(source), dict) and "concurrency" in config[source]
+        }
+        return cls(concurrency=concurrency)
+
+    def _semaphore(self, source: str) -> asyncio.Semaphore:
+        if source not in self._semaphores:
+            limit = self.concurrency.get(source, self.default_concurrency)
+            self._semaphores[source] = asyncio.Semaphore(limit)
+        return self._semaphores[source]
+
+    @staticmethod
+    def _agent(source: str) -> BaseAgent:
+        # One agent per job: stream() keeps the job's api_key, base_url and
+        # parsing mode on the agent, so concurrent jobs must not share one
+        return AGENT_CLASSES[source]()
+
+    def low_watermark(self) -> Optional[datetime]:
+        """
+        :return: Naive UTC date before which no unfinished job of the current
+            ``stream`` will yield another event, or None once all have finished.
+        """
+        return min(self._progress.values()) if self._progress else None
+
+    def _advance(self, job: AgentJob, progress: Optional[datetime]) -> None:
+        if progress is None or id(job) not in self._progress:
+            return
+        if progress.tzinfo is not None:
+            progress = progress.astimezone(timezone.utc).replace(tzinfo=None)
+        self._progress[id(job)] = max(self._progress[id(job)], progress)
+
+    async def stream_job(self, job: AgentJob, sink: Callable[[List[EventItem]], Awaitable[None]]) -> JobResult:
+        agent = self._agent(job.source)
+        result = JobResult(job=job)
+
+        async def drain() -> None:
+            async for batch in agent.stream(job.data):
+                result.count += len(batch)
+                await sink(batch)
+                # Only once the batch is handed on, so the watermark never runs ahead of the sink
+                self._advance(job, agent.progress)
+
+        async with self._semaphore(job.source):
+            started = time.perf_counter()
+            try:
+                await asyncio.wait_for(drain(), timeout=job.timeout)
+            except asyncio.TimeoutError as e:
+                await agent.log(
+                    f"Job for {job.source} exceeded deadline of {job.timeout}s after {result.count} events",
+                    level="WARNING"
+                )
+                result.error = e
+            except Exception as e:
+                await agent.handle_error(e, context=job.data.get("city"))
+                result.error = e
+            result.elapsed = time.perf_counter() - started
+        self._progress.pop(id(job), None)
+        return result
+
+    async def stream(self, jobs: List[AgentJob], sink: Callable[[List[EventItem]], Awaitable[None]]) -> List[JobResult]:
+        """
+        Runs all jobs concurrently, handing every batch to ``sink`` as soon
+        as an agent yields it. Batches emitted before a job fails or times
+        out are kept.
+
+        :param jobs: Jobs to run.
+        :param sink: Coroutine receiving each batch; may block to apply backpressure.
+        :return: One JobResult per job with its event count.
+        """
+        # A job yields nothing before its window, even while it waits for its source's semaphore
+        self._progress = {id(job): datetime.strptime(job.data["start_datetime"], DATE_FORMAT) for job in jobs}
+        try:
+            return list(await asyncio.gather(*(self.stream_job(job, sink) for job in jobs)))
+        finally:
+            self._progress = {}
@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional, Tuple
+
+from event_keys import content_hash, document_id
+from event_model import EventItem
+from pipeline import Stage
+
+
+def _timestamp(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+class SeenIndex:
+    """
+    Persistent cross-run index of stored events, backed by SQLite.
+
+    Maps each event's document ID to the content hash that was last stored
+    and when it was last seen, so events that are unchanged since a previous
+    run can be dropped before they reach storage.
+    """
+
+    def __init__(self, path: str = "state/seen.sqlite", keep_past_days: float = 1, max_age_days: float = 30):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.keep_past = keep_past_days * 86400
+        self.max_age = max_age_days * 86400
+        self.logger = logging.getLogger("SeenIndex")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS seen ("
+            " doc_id TEXT PRIMARY KEY, content_hash TEXT, last_seen REAL, starts_at REAL)"
+        )
+        self._conn.commit()
+
+    def unchanged(self, keys: List[Tuple[str, str]]) -> set:
+        """
+        Looks up which events are unchanged since they were last stored and
+        refreshes their last-seen time.
+
+        :param keys: (document ID, content hash) pairs.
+        :return: Document IDs whose stored hash equals the given one.
+        """
+        found = set()
+        now = time.time()
+        with self._lock:
+            for offset in range(0, len(keys), 500):
+                chunk = dict(keys[offset:offset + 500])
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT doc_id, content_hash FROM seen WHERE doc_id IN ({placeholders})", list(chunk)
+                ).fetchall()
+                found.update(doc_id for doc_id, stored in rows if chunk[doc_id] == stored)
+            self._conn.executemany("UPDATE seen SET last_seen = ? WHERE doc_id = ?", [(now, doc_id) for doc_id in found])
+            self._conn.commit()
+        return found
+
+    def mark(self, entries: Iterable[Tuple[str, str, Optional[str]]]) -> None:
+        """
+        Records events as stored.
+
+        :param entries: (document ID, content hash, ISO start date) triples.
+        """
+        now = time.time()
+        rows = [(doc_id, digest, now, _timestamp(start)) for doc_id, digest, start in entries]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO seen VALUES (?, ?, ?, ?)", rows)
+            self._conn.commit()
+
+    def compact(self) -> int:
+        """
+        Drops events that are already over or have not been seen for a
+        long time, then reclaims the file space.
+
+        :return: Number of removed entries.
+        """
+        now = time.time()
+        with self._lock:
+            removed = self._conn.execute(
+                "DELETE FROM seen WHERE starts_at < ? OR last_seen < ?",
+                (now - self.keep_past, now - self.max_age),
+            ).rowcount
+            self._conn.commit()
+            self._conn.execute("VACUUM")
+        self.logger.info(f"Compacted seen index, removed {removed} entries")
+        return removed
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class SeenFilterStage(Stage):
+    """
+    Drops events whose content is identical to what a previous run stored.
+
+    Runs after dedup (so merged events are judged as a whole) and before
+    storage; the storage stage marks events in the index once written.
+    """
+
+    name = "seen_filter"
+
+    def __init__(self, index: SeenIndex):
+        self.index = index
+        self.dropped = 0
+
+    async def process(self, batch: List[EventItem]) -> List[EventItem]:
+        keys = [(document_id(event), content_hash(event)) for event in batch]
+        unchanged = await asyncio.to_thread(self.index.unchanged, keys)
+        if not unchanged:
+            return batch
+        changed = [event for event, (doc_id, _) in zip(batch, keys) if doc_id not in unchanged]
+        self.dropped += len(batch) - len(changed)
+        return changed
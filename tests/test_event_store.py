@@ -0,0 +1,29 @@
+from datetime import datetime
+
+from event_model import EventItem
+from event_store import EventStore
+
+
+def test_list_fields_round_trip():
+    events = [
+        EventItem(source="ticketmaster", title="Empty", start_date=datetime(2026, 1, 1, 20), labels=[], image_urls=[]),
+        EventItem(source="ticketmaster", title="Missing", start_date=datetime(2026, 1, 2, 20), labels=None, image_urls=None),
+        EventItem(source="ticketmaster", title="One", start_date=datetime(2026, 1, 3, 20), labels=["theatre"], image_urls=["https://example.com/a.jpg"]),
+        EventItem(source="ticketmaster", title="Two", start_date=datetime(2026, 1, 4, 20), labels=["theatre", "music"], ticket_urls=[]),
+    ]
+    store = EventStore(events)
+
+    assert store.column("labels") == [[], None, ["theatre"], ["theatre", "music"]]
+    assert store.column("image_urls") == [[], None, ["https://example.com/a.jpg"], None]
+    assert store.column("ticket_urls") == [None, None, None, []]
+    assert [event.labels for event in store.to_events()] == [[], None, ["theatre"], ["theatre", "music"]]
+
+
+def test_single_label_filter():
+    events = [
+        EventItem(source="ticketmaster", title="Empty", labels=[]),
+        EventItem(source="ticketmaster", title="One", labels=["theatre"]),
+    ]
+    store = EventStore(events)
+
+    assert store.mask(labels="theatre").tolist() == [False, True]
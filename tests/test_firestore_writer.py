@@ -0,0 +1,109 @@
+import asyncio
+import json
+import os
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from fake_firestore import FakeFirestore
+from mock_apis import start_in_process
+
+from event_model import EventItem
+from firestore_writer import FirestoreWriter
+from main import run
+
+
+class FailingBulkWriter:
+    """
+    BulkWriter that rejects every write, calling the error callback the way
+    google-cloud-firestore does: ``callback(BulkWriteFailure, BulkWriter)``.
+    """
+
+    def __init__(self):
+        self._operations = []
+        self._callback = None
+
+    def on_write_error(self, callback):
+        self._callback = callback
+
+    def set(self, reference, data):
+        self._operations.append(SimpleNamespace(reference=SimpleNamespace(id=reference.id, path=f"events/{reference.id}"), attempts=0))
+
+    def close(self):
+        for operation in self._operations:
+            while True:
+                operation.attempts += 1
+                failure = SimpleNamespace(operation=operation, code=14, message="unavailable", attempts=operation.attempts)
+                if not self._callback(failure, self):
+                    break
+
+
+class FailingBulkFirestore(FakeFirestore):
+    def bulk_writer(self):
+        return FailingBulkWriter()
+
+
+def _events(count):
+    start = datetime(2026, 3, 1, 20)
+    return [
+        EventItem(source="ticketmaster", source_id=f"tm-{index}", title=f"Show {index}", start_date=start + timedelta(days=index))
+        for index in range(count)
+    ]
+
+
+def test_bulk_write_failures_are_counted():
+    db = FailingBulkFirestore()
+    writer = FirestoreWriter(db, use_bulk_writer=True, max_retries=3)
+
+    stats = asyncio.run(writer.write(_events(5)))
+
+    assert stats.failed == 5
+    assert stats.written == 0
+    assert not db.documents
+
+
+def test_watermarks_not_saved_after_bulk_write_failures(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    process, url = start_in_process(events=200, serp_events=10, latency_ms=1, jitter_ms=0)
+    try:
+        config = {
+            "ticketmaster": {"enabled": True, "api_key": "test", "default_city": "London", "default_days": 30, "base_url": url},
+            "predicthq": {"enabled": False},
+            "serpapi": {"enabled": False},
+            "firebase": {"bulk_writer": True},
+            "export": {"enabled": False},
+            "pipeline": {"print_events": False},
+            "metrics": {"path": None},
+            "incremental": {"enabled": True, "path": str(tmp_path / "watermarks.json")},
+        }
+        results, stats = asyncio.run(run(config, FailingBulkFirestore()))
+    finally:
+        process.terminate()
+
+    assert all(result.ok for result in results)
+    assert stats.failed > 0
+    assert stats.written == 0
+    assert not os.path.exists(tmp_path / "watermarks.json")
+
+
+def test_watermarks_saved_after_clean_run(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    process, url = start_in_process(events=200, serp_events=10, latency_ms=1, jitter_ms=0)
+    try:
+        config = {
+            "ticketmaster": {"enabled": True, "api_key": "test", "default_city": "London", "default_days": 30, "base_url": url},
+            "predicthq": {"enabled": False},
+            "serpapi": {"enabled": False},
+            "firebase": {},
+            "export": {"enabled": False},
+            "pipeline": {"print_events": False},
+            "metrics": {"path": None},
+            "incremental": {"enabled": True, "path": str(tmp_path / "watermarks.json")},
+        }
+        _, stats = asyncio.run(run(config, FakeFirestore()))
+    finally:
+        process.terminate()
+
+    assert stats.failed == 0
+    assert stats.written > 0
+    with open(tmp_path / "watermarks.json", encoding="utf-8") as file:
+        assert json.load(file)
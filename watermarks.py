@@ -0,0 +1,104 @@
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Sequence, Tuple
+
+DATE_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+Range = Tuple[datetime, datetime]
+
+
+class WatermarkStore:
+    """
+    Persisted record of which date ranges have already been fetched, per
+    source and city, and when.
+
+    ``plan`` turns a requested horizon into the ranges that still need
+    fetching: a refresh band at the start of the horizon (near-term events
+    whose details change) plus any part not covered by a recent fetch.
+    """
+
+    def __init__(self, path: str = "state/watermarks.json", refresh_days: float = 2, max_age_days: float = 7):
+        self.path = path
+        self.refresh = timedelta(days=refresh_days)
+        self.max_age = timedelta(days=max_age_days)
+        self._marks: Dict[str, List[dict]] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as file:
+                self._marks = json.load(file)
+
+    @staticmethod
+    def key(source: str, city: str, keyword: str = "", categories: Sequence[str] = ()) -> str:
+        key = f"{source}|{(city or '').lower()}|{(keyword or '').lower()}"
+        if categories:
+            key += "|" + ",".join(sorted(category.lower() for category in categories))
+        return key
+
+    def _covered(self, key: str, now: datetime) -> List[Range]:
+        covered = []
+        for mark in self._marks.get(key, []):
+            if now - datetime.strptime(mark["fetched_at"], DATE_FORMAT) <= self.max_age:
+                covered.append((
+                    datetime.strptime(mark["start"], DATE_FORMAT),
+                    datetime.strptime(mark["end"], DATE_FORMAT),
+                ))
+        return sorted(covered)
+
+    def plan(self, key: str, start: datetime, end: datetime, now: datetime) -> List[Range]:
+        """
+        Returns the ranges of [start, end) that should be fetched.
+
+        :param key: Watermark key from WatermarkStore.key.
+        :param start: Start of the requested horizon.
+        :param end: End of the requested horizon.
+        :param now: Current time, used to judge watermark freshness.
+        :return: Chronologically ordered, non-overlapping ranges.
+        """
+        band_end = min(start + self.refresh, end)
+        ranges = [(start, band_end)] if band_end > start else []
+
+        cursor = band_end
+        for covered_start, covered_end in self._covered(key, now):
+            if covered_end <= cursor:
+                continue
+            if covered_start >= end:
+                break
+            if covered_start > cursor:
+                ranges.append((cursor, covered_start))
+            cursor = max(cursor, covered_end)
+        if cursor < end:
+            ranges.append((cursor, end))
+
+        # Adjacent ranges (e.g. the refresh band and the first gap) become one request
+        merged: List[Range] = []
+        for range_start, range_end in ranges:
+            if merged and merged[-1][1] >= range_start:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], range_end))
+            else:
+                merged.append((range_start, range_end))
+        return merged
+
+    def record(self, key: str, start: datetime, end: datetime, now: datetime) -> None:
+        """
+        Marks [start, end) as fetched at ``now`` and drops ranges that are
+        stale or entirely in the past.
+        """
+        marks = [
+            mark for mark in self._marks.get(key, [])
+            if datetime.strptime(mark["end"], DATE_FORMAT) > now
+            and now - datetime.strptime(mark["fetched_at"], DATE_FORMAT) <= self.max_age
+        ]
+        marks.append({
+            "start": start.strftime(DATE_FORMAT),
+            "end": end.strftime(DATE_FORMAT),
+            "fetched_at": now.strftime(DATE_FORMAT),
+        })
+        self._marks[key] = marks
+
+    def save(self) -> None:
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(self._marks, file, indent=2)
+        os.replace(tmp_path, self.path)